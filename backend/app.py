@@ -1,34 +1,146 @@
-from flask import Flask, request, jsonify
-from database import init_db
+from flask import Blueprint, Flask, Response, g, request, jsonify, make_response, stream_with_context
+from cache import query_cache
+from compression import compress_response
+from change_feed import CHANGE_FEED_HEARTBEAT, EVENT_TYPES, HEARTBEAT, RESET, change_feed
+from database import ensure_db, get_pool, get_replicas, init_db, init_app as init_db_pool, release_db_connection
+from instrumentation import bind_request, finish_request, snapshot, start_request
 from flask_cors import CORS
 from models import (
     add_customer, get_customers, update_customer, delete_customer, add_vehicle, get_vehicles_by_customer, get_customer_id_from_name,
-    add_service_package, get_service_packages, add_appointment, get_appointments, get_monthly_appointments,
+    add_service_package, get_service_packages, add_appointment, update_appointment_status, get_appointments, get_monthly_appointments,
     add_inventory, get_inventory, update_inventory,
-    add_employee, get_employees, get_vehicle,
-    add_schedule_appointment, get_service_chart_data, inventory_usage, get_appointments_today, get_low_inventory, get_upcoming_appointments
+    add_employee, get_employees, get_vehicle, get_vehicles_with_customers, get_service_records,
+    add_schedule_appointment, get_service_chart_data, inventory_usage, get_appointments_today, get_low_inventory, get_upcoming_appointments,
+    get_row_counts, get_table_versions, search, SEARCH_KINDS, SEARCH_LIMIT, InsufficientStockError, SlotUnavailableError, get_available_slots, get_inventory_ledger, compact_inventory_ledger, start_ledger_compactor,
+    archive_appointments, start_appointment_archiver, get_archived_appointments, get_archived_appointment, ARCHIVE_BATCH_SIZE,
+    bulk_import, BULK_IMPORTS, IMPORT_BATCH_SIZE, get_appointment_series, get_package_series, get_inventory_series, next_cursor, InvalidQueryError, stream_export, EXPORT_QUERIES
 )
+from serialization import JSONProvider
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import csv
+import functools
+import io
+import click
 import json
+import os
 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint('api', __name__)
 
-# Initialize the database during app startup
-with app.app_context():
-    init_db()
+LEDGER_COMPACT_INTERVAL = float(os.getenv("LEDGER_COMPACT_INTERVAL", "60"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
+# Query counts, DB time and latency per request, reported at /debug/stats
+@api.before_app_request
+def start_request_stats():
+    rule = request.url_rule.rule if request.url_rule else "(unmatched)"
+    g.stats_token = start_request(f"{request.method} {rule}")
+
+@api.after_app_request
+def note_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+@api.teardown_app_request
+def finish_request_stats(error=None):
+    token = g.pop('stats_token', None)
+    if token is not None:
+        finish_request(token, error is not None or g.get('response_status', 500) >= 500)
+
+# The schema is checked, and the ledger compactor and archiver started, on
+# the first request rather than at import, so workers start without a
+# database round trip and no thread is started before a preforking server
+# forks
+@api.before_app_request
+def check_db():
+    ensure_db()
+    start_ledger_compactor(LEDGER_COMPACT_INTERVAL)
+    start_appointment_archiver(ARCHIVE_INTERVAL, ARCHIVE_AFTER_DAYS)
+
+# Large JSON and CSV bodies are compressed for clients that accept it
+@api.after_app_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
+
+@api.app_errorhandler(InsufficientStockError)
+def insufficient_stock(error):
+    return jsonify({'error': str(error)}), 409
+
+@api.app_errorhandler(SlotUnavailableError)
+def slot_unavailable(error):
+    return jsonify({'error': str(error)}), 409
+
+@api.app_errorhandler(InvalidQueryError)
+def invalid_query(error):
+    return jsonify({'error': str(error)}), 400
+
+def page_args():
+    """Pagination arguments shared by the list endpoints."""
+    return {
+        'limit': request.args.get('limit', type=int),
+        'after': request.args.get('after'),
+        'sort': request.args.get('sort'),
+        'order': request.args.get('order', 'asc'),
+    }
+
+def fields_arg():
+    """The ?fields= columns as a list, or None for all of them."""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+def list_response(rows, page, id_column):
+    """JSON array of rows; the next page's cursor goes in the X-Next-Cursor header."""
+    response = jsonify(rows)
+    cursor = next_cursor(rows, page['limit'], page['sort'] or id_column, id_column)
+    if cursor:
+        response.headers['X-Next-Cursor'] = cursor
+    return response
+
+def conditional(*tables):
+    """ETag a GET route by the versions of the tables it reads.
+
+    A request whose If-None-Match still matches gets 304 Not Modified
+    before the view runs, so neither the query nor the serialization
+    happens. The date is part of the tag because some routes depend on
+    CURDATE().
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+            versions = get_table_versions(tables)
+            etag = date.today().isoformat() + "." + ".".join(str(version) for version in versions)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # Cache, but check back every time
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
 
 # Routes for Customers
-@app.route('/customers', methods=['GET', 'POST'])
+@api.route('/customers', methods=['GET', 'POST'])
+@conditional("Customers")
 def customers():
     if request.method == 'POST':
         data = request.json
         add_customer(data['name'], data['email'], data['phone'], data['address'])
         return jsonify({'message': 'Customer added successfully', 'data': data}), 201
     else:
-        customers = get_customers()
-        return jsonify([dict(customer) for customer in customers])
+        page = page_args()
+        customers = get_customers(fields=fields_arg(), **page)
+        return list_response(customers, page, 'customer_id')
     
-@app.route('/customers/<int:customer_id>', methods=['PUT', 'DELETE'])
+@api.route('/customers/<int:customer_id>', methods=['PUT', 'DELETE'])
 def update_customer_data(customer_id):
     if request.method == 'DELETE':
         delete_customer(customer_id)
@@ -37,31 +149,42 @@ def update_customer_data(customer_id):
     update_customer(customer_id, data['name'], data['email'], data['phone'], data['address'])
     return jsonify({'message': 'Customer updated successfully', 'data': data}), 201
 
-@app.route('/metrics', methods=['GET'])
+@api.route('/search', methods=['GET'])
+@conditional("Customers", "Vehicles")
+def search_customers_and_vehicles():
+    kinds = tuple(request.args.getlist('type')) or SEARCH_KINDS
+    limit = request.args.get('limit', SEARCH_LIMIT, type=int)
+    return jsonify(search(request.args.get('q', ''), limit, kinds))
+
+def metrics_panel(counts):
+    return {
+        'customer_count': counts.get('Customers', 0),
+        'vehicle_count': counts.get('Vehicles', 0),
+        # Archived appointments still count, as they do in the analytics
+        'appointment_count': counts.get('Appointments', 0) + counts.get('Appointments_Archive', 0),
+        'inventory_count': counts.get('Inventory', 0)
+    }
+
+@api.route('/metrics', methods=['GET'])
+@conditional("Customers", "Vehicles", "Appointments", "Inventory")
 def metrics():
-    customers = get_customers()
-    vehicles = get_vehicles_by_customer(None)
-    appointments = get_appointments()
-    inventory = get_inventory()
-    return jsonify({
-        'customer_count': len(customers),
-        'vehicle_count': len(vehicles),
-        'appointment_count': len(appointments),
-        'inventory_count': len(inventory)
-    })
+    return jsonify(metrics_panel(get_row_counts()))
 
 # Routes for Vehicles
-@app.route('/customers/<int:customer_id>/vehicles', methods=['GET', 'POST'])
+@api.route('/customers/<int:customer_id>/vehicles', methods=['GET', 'POST'])
+@conditional("Vehicles", "Customers")
 def vehicles(customer_id):
     if request.method == 'POST':
         data = request.json
         add_vehicle(customer_id, data['model_year'], data['license_plate'])
         return jsonify({'message': 'Vehicle added successfully'}), 201
     else:
-        vehicles = get_vehicles_by_customer(customer_id)
-        return jsonify([dict(vehicle) for vehicle in vehicles])
+        page = page_args()
+        vehicles = get_vehicles_with_customers(customer_id, fields=fields_arg(), **page)
+        return list_response(vehicles, page, 'vehicle_id')
     
-@app.route('/vehicles', methods=['GET', 'POST'])
+@api.route('/vehicles', methods=['GET', 'POST'])
+@conditional("Vehicles", "Customers")
 def vehicles_all():
     if request.method == 'POST':
         data = request.json
@@ -71,17 +194,20 @@ def vehicles_all():
         vehicle['customer_name'] = data['customer_name']
         return jsonify({'message': 'Vehicle added successfully', 'data': vehicle}), 201
     else:
-        vehicles = get_vehicles_by_customer(None)
-        vehicles_with_customers = []
-        for vehicle in vehicles:
-            customer = get_customers(vehicle['customer_id'])
-            vehicle_with_customer = dict(vehicle)
-            vehicle_with_customer['customer_name'] = customer['name']
-            vehicles_with_customers.append(vehicle_with_customer)
-        return jsonify(vehicles_with_customers)
+        page = page_args()
+        vehicles = get_vehicles_with_customers(fields=fields_arg(), **page)
+        return list_response(vehicles, page, 'vehicle_id')
+
+# Routes for Service Records
+@api.route('/service_records', methods=['GET'])
+@conditional("Service_Records", "Employees")
+def service_records():
+    records = get_service_records(request.args.get('appointment_id', type=int))
+    return jsonify([dict(record) for record in records])
 
 # Routes for Service Packages
-@app.route('/service_packages', methods=['GET', 'POST'])
+@api.route('/service_packages', methods=['GET', 'POST'])
+@conditional("Service_Packages")
 def service_packages():
     if request.method == 'POST':
         data = request.json
@@ -92,7 +218,8 @@ def service_packages():
         return jsonify([dict(package) for package in packages])
 
 # Routes for Appointments
-@app.route('/appointments', methods=['GET', 'POST'])
+@api.route('/appointments', methods=['GET', 'POST'])
+@conditional("Appointments", "Vehicles", "Service_Packages")
 def appointments():
     if request.method == 'POST':
         data = request.json
@@ -102,93 +229,405 @@ def appointments():
         )
         return jsonify({'message': 'Appointment created successfully'}), 201
     else:
-        appointments = get_appointments()
-        return jsonify([dict(appointment) for appointment in appointments])
+        page = page_args()
+        appointments = get_appointments(
+            status=request.args.get('status'),
+            date_from=request.args.get('date_from'),
+            date_to=request.args.get('date_to'),
+            **page
+        )
+        return list_response(appointments, page, 'appointment_id')
     
-# @app.route('/upcoming_appointments', methods=['GET'])
+@api.route('/appointments/<int:appointment_id>/status', methods=['PUT'])
+def appointment_status(appointment_id):
+    data = request.json
+    if not update_appointment_status(appointment_id, data.get('status')):
+        return jsonify({'error': f"Appointment {appointment_id} not found"}), 404
+    return jsonify({'message': 'Appointment status updated successfully'}), 201
+
+# Archived history: closed appointments moved out of the live tables
+@api.route('/history/appointments', methods=['GET'])
+@conditional("Appointments_Archive", "Vehicles", "Service_Packages")
+def archived_appointments():
+    page = page_args()
+    appointments = get_archived_appointments(
+        vehicle_id=request.args.get('vehicle_id', type=int),
+        customer_id=request.args.get('customer_id', type=int),
+        status=request.args.get('status'),
+        date_from=request.args.get('date_from'),
+        date_to=request.args.get('date_to'),
+        **page
+    )
+    return list_response(appointments, page, 'appointment_id')
+
+@api.route('/history/appointments/<int:appointment_id>', methods=['GET'])
+@conditional("Appointments_Archive", "Employees", "Inventory")
+def archived_appointment(appointment_id):
+    appointment = get_archived_appointment(appointment_id)
+    if appointment is None:
+        return jsonify({'error': f"Appointment {appointment_id} is not archived"}), 404
+    return jsonify(appointment)
+
+# @api.route('/upcoming_appointments', methods=['GET'])
 # def upcoming_appointments():
 #     appointments = get_appointments()
 #     return jsonify([dict(appointment) for appointment in appointments])
 
-@app.route('/monthy_appointments', methods=['GET'])
-def monthy_appointments():
-    appointments = get_monthly_appointments()
+def monthly_appointments_panel(appointments):
     monthly_data = []
     month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
     for row in appointments:
         month_index = int(row['month']) - 1  # Convert '01', '02', etc. to 0-based index
         monthly_data.append({
-            "name": month_names[month_index],
+            "name": f"{month_names[month_index]} {row['year']}",
             "appointments": row['appointments']
         })
+    return monthly_data
 
-    return jsonify(monthly_data)
+@api.route('/monthy_appointments', methods=['GET'])
+@conditional("Appointments")
+def monthy_appointments():
+    return jsonify(monthly_appointments_panel(get_monthly_appointments()))
     
+SERIES = {
+    'appointments': get_appointment_series,
+    'packages': get_package_series,
+    'inventory': get_inventory_series,
+}
+
+@api.route('/analytics/<metric>', methods=['GET'])
+@conditional("Appointments", "Service_Packages", "ServiceRecord_Inventory", "Inventory")
+def analytics(metric):
+    if metric not in SERIES:
+        return jsonify({'error': f"Unknown metric '{metric}'"}), 404
+    try:
+        start = date.fromisoformat(request.args['start'])
+        end = date.fromisoformat(request.args['end'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+    return jsonify(SERIES[metric](start, end, request.args.get('granularity', 'day')))
+
 # Routes for Inventory
-@app.route('/inventory', methods=['GET', 'POST'])
+@api.route('/inventory', methods=['GET', 'POST'])
+@conditional("Inventory")
 def inventory():
     if request.method == 'POST':
         data = request.json
-        add_inventory(data['product_name'], data['reorder_level'], data['quantity'])
+        add_inventory(data['product_name'], data['quantity'], data['reorder_level'])
         return jsonify({'message': 'Inventory item added successfully'}), 201
     else:
-        inventory = get_inventory()
-        return jsonify([dict(item) for item in inventory])
+        page = page_args()
+        inventory = get_inventory(low_stock=request.args.get('low_stock') == 'true', fields=fields_arg(), **page)
+        return list_response(inventory, page, 'inventory_id')
     
-@app.route('/inventory/<int:product_id>', methods=['PUT'])
+@api.route('/inventory/<int:product_id>', methods=['PUT'])
 def update_inventory_data(product_id):
     data = request.json
-    update_inventory(product_id, data['product_name'], data['reorder_level'], data['quantity'])
+    if not update_inventory(product_id, data['product_name'], data['reorder_level'], data['quantity']):
+        return jsonify({'error': f"Inventory item {product_id} not found"}), 404
     return jsonify({'message': 'Inventory item updated successfully'}), 201
     
+@api.route('/inventory/<int:product_id>/ledger', methods=['GET'])
+@conditional("Inventory")
+def inventory_ledger(product_id):
+    page = page_args()
+    # Newest entries first unless asked otherwise
+    page['order'] = request.args.get('order', 'desc')
+    entries = get_inventory_ledger(product_id, page['limit'], page['after'], page['order'])
+    return list_response(entries, page, 'entry_id')
+    
 # Routes for Employees
-@app.route('/employees', methods=['GET', 'POST'])
+@api.route('/employees', methods=['GET', 'POST'])
+@conditional("Employees")
 def employees():
     if request.method == 'POST':
         data = request.json
         add_employee(data['name'], data['email'], data['phone'])
         return jsonify({'message': 'Employee added successfully'}), 201
     else:
-        employees = get_employees()
-        return jsonify([dict(employee) for employee in employees])
+        page = page_args()
+        active = request.args.get('active')
+        employees = get_employees(is_active=None if active is None else active == 'true', fields=fields_arg(), **page)
+        return list_response(employees, page, 'employee_id')
     
-@app.route('/schedule_appointment', methods=['POST'])
+@api.route('/availability', methods=['GET'])
+@conditional("Appointments", "Service_Records", "Employees", "Service_Packages")
+def availability_slots():
+    try:
+        day = date.fromisoformat(request.args['date'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'date must be a YYYY-MM-DD date'}), 400
+    package_id = request.args.get('package_id', type=int)
+    if package_id is None:
+        return jsonify({'error': 'package_id is required'}), 400
+    return jsonify(get_available_slots(day, package_id, request.args.get('employee_id', type=int)))
+
+@api.route('/schedule_appointment', methods=['POST'])
 def schedule_appointment():
     data = request.get_json()
     body = json.loads(data['body'])
-    print(body)
-    add_schedule_appointment(
+    appointment_id = add_schedule_appointment(
         body['customer_id'], body['vehicle_id'], body['package_id'], body['employee_id'],
         body['appointment_date'], body['appointment_time'], body['service_details'],
         body['service_duration'], body['inventory_items']
     )
-    return jsonify({'message': 'Appointment created successfully'}), 201
+    return jsonify({'message': 'Appointment created successfully', 'appointment_id': appointment_id}), 201
+
+def chart_panel(data):
+    return [{"name": row["name"], "value": row["value"]} for row in data]
+
+def actionable_insights_panel(appointments_today, low_inventory):
+    return {
+        'appointments_today': appointments_today['appointments_today'],
+        'low_inventory': low_inventory['low_inventory_items']
+    }
 
-@app.route('/service-usage', methods=['GET'])
+@api.route('/service-usage', methods=['GET'])
+@conditional("Service_Packages", "Appointments")
 def get_service_usage():
-    data = get_service_chart_data()
-    service_usage = [{"name": row["name"], "value": row["value"]} for row in data]
-    return jsonify(service_usage)
+    return jsonify(chart_panel(get_service_chart_data()))
 
-@app.route('/inventory-usage', methods=['GET'])
+@api.route('/inventory-usage', methods=['GET'])
+@conditional("Inventory", "ServiceRecord_Inventory")
 def get_inventory_usage():
-    data = inventory_usage()
-    inventory_usage_data = [{"name": row["name"], "value": row["value"]} for row in data]
-    return jsonify(inventory_usage_data)
+    return jsonify(chart_panel(inventory_usage()))
 
-@app.route('/actionable-insights', methods=['GET'])
+@api.route('/actionable-insights', methods=['GET'])
+@conditional("Appointments", "Inventory")
 def actionable_insights():
-    appointments_today = get_appointments_today()
-    low_inventory = get_low_inventory()
-    return jsonify({
-        'appointments_today': appointments_today['appointments_today'],
-        'low_inventory': low_inventory['low_inventory_items']
-    })
+    return jsonify(actionable_insights_panel(get_appointments_today(), get_low_inventory()))
     
-@app.route('/upcoming-appointments', methods=['GET'])
+@api.route('/upcoming-appointments', methods=['GET'])
+@conditional("Appointments", "Vehicles", "Customers", "Service_Packages")
 def upcoming_appointments():
     appointments = get_upcoming_appointments()
     return jsonify([dict(appointment) for appointment in appointments])
+
+# Dashboard: every panel in one response. The queries are independent, so
+# they run concurrently on a small thread pool; worker threads have no app
+# context and each borrows its own pooled connection.
+DASHBOARD_QUERIES = {
+    'counts': get_row_counts,
+    'appointments_today': get_appointments_today,
+    'low_inventory': get_low_inventory,
+    'service_usage': get_service_chart_data,
+    'inventory_usage': inventory_usage,
+    'monthly_appointments': get_monthly_appointments,
+    'upcoming_appointments': get_upcoming_appointments,
+}
+DASHBOARD_WORKERS = int(os.getenv("DASHBOARD_WORKERS", len(DASHBOARD_QUERIES)))
+dashboard_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+
+@api.route('/dashboard', methods=['GET'])
+@conditional("Customers", "Vehicles", "Appointments", "Inventory", "Service_Packages", "ServiceRecord_Inventory")
+def dashboard():
+    # Hand back the connection the ETag check borrowed, or this request
+    # would hold it while its workers wait for theirs and a burst of
+    # dashboards could drain the pool
+    release_db_connection()
+    # Each worker borrows its own connection but counts its queries
+    # towards this request's stats
+    futures = {
+        name: dashboard_executor.submit(bind_request(query))
+        for name, query in DASHBOARD_QUERIES.items()
+    }
+    results = {name: future.result() for name, future in futures.items()}
+    return jsonify({
+        'metrics': metrics_panel(results['counts']),
+        'actionable_insights': actionable_insights_panel(results['appointments_today'], results['low_inventory']),
+        'service_usage': chart_panel(results['service_usage']),
+        'inventory_usage': chart_panel(results['inventory_usage']),
+        'monthly_appointments': monthly_appointments_panel(results['monthly_appointments']),
+        'upcoming_appointments': [dict(appointment) for appointment in results['upcoming_appointments']],
+    })
+
+# Change feed: a text/event-stream of typed change events, so dashboards
+# can refresh the panels that changed instead of polling. Reconnecting
+# clients send Last-Event-ID and are replayed what they missed.
+@api.route('/events', methods=['GET'])
+def events():
+    types = request.args.get('types')
+    types = set(types.split(',')) if types else None
+    if types and not types <= set(EVENT_TYPES):
+        return jsonify({'error': f"types must be among {', '.join(EVENT_TYPES)}"}), 400
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be an integer'}), 400
+
+    # Subscribe before replaying so nothing committed in between is missed;
+    # the events both return are sent once
+    subscription = change_feed.subscribe(types)
+    try:
+        replayed, complete = change_feed.replay(last_event_id, types) if last_event_id is not None else ([], True)
+    except Exception:
+        change_feed.unsubscribe(subscription)
+        raise
+
+    # Not wrapped in stream_with_context: the request's database connection
+    # is released before the stream starts rather than held while it is open
+    replayed_ids = {event.id for event in replayed}
+
+    def stream():
+        try:
+            yield b"retry: 3000\n\n"
+            if not complete:
+                yield RESET
+            for event in replayed:
+                yield event.message
+            while True:
+                events = subscription.get(CHANGE_FEED_HEARTBEAT)
+                if events is None:
+                    # Fell too far behind; the client reconnects with the
+                    # last id it saw and is replayed from there
+                    return
+                if not events:
+                    yield HEARTBEAT
+                    continue
+                chunk = b"".join(event.message for event in events if event.id not in replayed_ids)
+                if chunk:
+                    yield chunk
+        finally:
+            change_feed.unsubscribe(subscription)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@api.route('/debug/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(query_cache.stats())
+
+@api.route('/debug/stats', methods=['GET'])
+def debug_stats():
+    stats = snapshot(top=request.args.get('top', 50, type=int))
+    stats['pool'] = get_pool().stats()
+    if get_replicas() is not None:
+        stats['replicas'] = get_replicas().stats()
+    stats['cache'] = query_cache.stats()
+    stats['change_feed'] = change_feed.stats()
+    return jsonify(stats)
+
+# Bulk import: a JSON array, a text/csv body or a multipart upload named "file"
+@api.route('/import/<kind>', methods=['POST'])
+def import_rows(kind):
+    if kind not in BULK_IMPORTS:
+        return jsonify({'error': f"Unknown import '{kind}'"}), 404
+    batch_size = request.args.get('batch_size', IMPORT_BATCH_SIZE, type=int)
+    # utf-8-sig drops the byte order mark Excel puts at the start of its CSVs
+    if 'file' in request.files:
+        rows = csv.DictReader(io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig'))
+    elif request.mimetype == 'text/csv':
+        rows = csv.DictReader(io.TextIOWrapper(request.stream, encoding='utf-8-sig'))
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({'error': 'Expected a JSON array, CSV body or CSV file upload'}), 400
+    report = bulk_import(kind, rows, batch_size)
+    return jsonify(report), 201 if report['inserted'] else 200
+
+# Streaming exports
+def export_value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        total_seconds = int(value.total_seconds())
+        return f"{total_seconds // 3600:02d}:{total_seconds % 3600 // 60:02d}:{total_seconds % 60:02d}"
+    if value is None or isinstance(value, (int, str)):
+        return value
+    return str(value)
+
+def ndjson_chunks(rows):
+    columns = next(rows)
+    for batch in rows:
+        yield "".join(
+            json.dumps({column: export_value(value) for column, value in zip(columns, row)}) + "\n"
+            for row in batch
+        )
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(next(rows))
+    for batch in rows:
+        writer.writerows([export_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty table
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@api.route('/export/<name>', methods=['GET'])
+def export(name):
+    if name not in EXPORT_QUERIES:
+        return jsonify({'error': f"Unknown export '{name}'"}), 404
+    export_format = request.args.get('format', 'ndjson')
+    if export_format == 'csv':
+        chunks, mimetype = csv_chunks, 'text/csv'
+    elif export_format == 'ndjson':
+        chunks, mimetype = ndjson_chunks, 'application/x-ndjson'
+    else:
+        return jsonify({'error': "format must be 'ndjson' or 'csv'"}), 400
+    response = Response(stream_with_context(chunks(stream_export(name))), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{export_format}'
+    return response
+
+def create_app():
+    app = Flask(__name__)
+    app.json = JSONProvider(app)
+    CORS(app, expose_headers=['X-Next-Cursor'])
+    init_db_pool(app)
+    app.register_blueprint(api)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create missing tables and apply pending migrations."""
+        init_db()
+
+    @app.cli.command('compact-inventory')
+    def compact_inventory_command():
+        """Fold pending inventory ledger entries into the stock snapshots."""
+        total = 0
+        while True:
+            folded = compact_inventory_ledger()
+            total += folded
+            if folded == 0:
+                break
+        click.echo(f"Compacted {total} ledger entries")
+
+    @app.cli.command('archive-appointments')
+    @click.option('--days', default=ARCHIVE_AFTER_DAYS, show_default=True,
+                  help="Archive completed and cancelled appointments older than this many days.")
+    def archive_appointments_command(days):
+        """Move closed appointments out of the live tables into the archive."""
+        total = 0
+        while True:
+            moved = archive_appointments(days)
+            total += moved
+            if moved < ARCHIVE_BATCH_SIZE:
+                break
+        click.echo(f"Archived {total} appointments")
+
+    @app.cli.command('import')
+    @click.argument('kind', type=click.Choice(sorted(BULK_IMPORTS)))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True)
+    def import_command(kind, path, batch_size):
+        """Bulk-load customers, vehicles or inventory from a CSV or JSON file."""
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            rows = json.load(f) if path.endswith('.json') else csv.DictReader(f)
+            report = bulk_import(kind, rows, batch_size)
+        click.echo(f"Inserted {report['inserted']} {kind}")
+        for error in report['errors']:
+            click.echo(f"Row {error['row']}: {error['error']}", err=True)
+
+    return app
+
+app = create_app()
+
 # Start the Flask application
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,192 @@
+"""Appointment slot availability.
+
+For each day that is asked about, the non-cancelled appointments are loaded
+once into sorted interval lists: one per employee (from Service_Records)
+and one for the shop's bays, which are only limited when BAY_COUNT is set.
+Free-slot searches and conflict checks then run against those lists in
+memory. Bookings made through this process are added as they commit;
+each loaded day is reloaded after AVAILABILITY_TTL seconds so bookings
+made by other workers show up too.
+
+Times are handled as minutes since midnight. An appointment lasts its
+service record's duration, or its package's duration when the record has
+none.
+"""
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from database import get_db_connection
+from datetime import timedelta
+from dotenv import load_dotenv
+import os
+import threading
+import time
+
+load_dotenv()
+
+BAY_COUNT = int(os.getenv("BAY_COUNT")) if os.getenv("BAY_COUNT") else None    # unset: bays are not limited
+OPENING_TIME = os.getenv("OPENING_TIME", "08:00")
+CLOSING_TIME = os.getenv("CLOSING_TIME", "18:00")
+SLOT_STEP_MINUTES = int(os.getenv("SLOT_STEP_MINUTES", "15"))
+AVAILABILITY_TTL = float(os.getenv("AVAILABILITY_TTL", "30"))
+DEFAULT_DURATION = 60
+DAYS_CACHED = 60
+
+
+def to_minutes(value):
+    """Minutes since midnight from 'HH:MM', 'HH:MM:SS' or a MySQL TIME (timedelta)."""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds() // 60)
+    try:
+        hours, minutes = str(value).split(":")[:2]
+        return int(hours) * 60 + int(minutes)
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}'")
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class DaySchedule:
+    def __init__(self):
+        self.loaded_at = time.monotonic()
+        self.employees = {}     # employee_id -> sorted [(start, end, appointment_id)]
+        self.bays = []          # sorted [(start, end, appointment_id)]
+
+    def add(self, start, end, appointment_id, employee_id=None, occupies_bay=True):
+        if occupies_bay:
+            insort(self.bays, (start, end, appointment_id))
+        if employee_id is not None:
+            insort(self.employees.setdefault(employee_id, []), (start, end, appointment_id))
+
+    def employee_conflicts(self, employee_id, start, end):
+        intervals = self.employees.get(employee_id, [])
+        # Only intervals that start before `end` can overlap
+        stop = bisect_left(intervals, (end,))
+        return [interval for interval in intervals[:stop] if interval[1] > start]
+
+    def bays_full(self, start, end):
+        """True if all bays are taken at some point in [start, end)."""
+        if BAY_COUNT is None:
+            return False
+        stop = bisect_left(self.bays, (end,))
+        overlapping = [interval for interval in self.bays[:stop] if interval[1] > start]
+        if len(overlapping) < BAY_COUNT:
+            return False
+        events = sorted(
+            [(max(s, start), 1) for s, _, _ in overlapping] + [(min(e, end), -1) for _, e, _ in overlapping]
+        )
+        in_use = 0
+        for _, change in events:
+            in_use += change
+            if in_use >= BAY_COUNT:
+                return True
+        return False
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self._days = OrderedDict()      # date string -> DaySchedule
+        self._lock = threading.Lock()
+
+    def schedule(self, day):
+        day = str(day)
+        with self._lock:
+            schedule = self._days.get(day)
+            if schedule is not None and time.monotonic() - schedule.loaded_at < AVAILABILITY_TTL:
+                self._days.move_to_end(day)
+                return schedule
+        conn = get_db_connection()
+        cursor = conn.cursor(prepared=True)
+        try:
+            return self.refresh(day, cursor)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def refresh(self, day, cursor):
+        """Reload the day through `cursor`, e.g. inside a booking's transaction."""
+        day = str(day)
+        schedule = self._load(day, cursor)
+        with self._lock:
+            self._days[day] = schedule
+            self._days.move_to_end(day)
+            while len(self._days) > DAYS_CACHED:
+                self._days.popitem(last=False)
+        return schedule
+
+    def record(self, day, start_time, duration, appointment_id, employee_id=None):
+        """Add a committed booking to the day, if that day is loaded."""
+        with self._lock:
+            schedule = self._days.get(str(day))
+            if schedule is not None:
+                start = to_minutes(start_time)
+                schedule.add(start, start + int(duration), appointment_id, employee_id)
+
+    def forget(self, day=None):
+        with self._lock:
+            if day is None:
+                self._days.clear()
+            else:
+                self._days.pop(str(day), None)
+
+    def conflicts(self, day, start_time, duration, employee_id=None, schedule=None):
+        """Reasons the slot cannot be booked; an empty list means it is free."""
+        start = to_minutes(start_time)
+        end = start + int(duration)
+        if schedule is None:
+            schedule = self.schedule(day)
+        reasons = []
+        if employee_id is not None:
+            for other_start, other_end, appointment_id in schedule.employee_conflicts(int(employee_id), start, end):
+                reasons.append(
+                    f"Employee {employee_id} is booked {format_minutes(other_start)}-{format_minutes(other_end)} "
+                    f"(appointment {appointment_id})"
+                )
+        if schedule.bays_full(start, end):
+            reasons.append(f"All {BAY_COUNT} bays are in use between {format_minutes(start)} and {format_minutes(end)}")
+        return reasons
+
+    def free_slots(self, day, duration, employee_ids, step=SLOT_STEP_MINUTES):
+        """[{'time': 'HH:MM', 'employees': [ids free for the whole slot]}] for the day."""
+        schedule = self.schedule(day)
+        opening, closing = to_minutes(OPENING_TIME), to_minutes(CLOSING_TIME)
+        slots = []
+        for start in range(opening, closing - duration + 1, step):
+            end = start + duration
+            if schedule.bays_full(start, end):
+                continue
+            free = [
+                employee_id for employee_id in employee_ids
+                if not schedule.employee_conflicts(employee_id, start, end)
+            ]
+            if free:
+                slots.append({'time': format_minutes(start), 'employees': free})
+        return slots
+
+    def _load(self, day, cursor):
+        schedule = DaySchedule()
+        cursor.execute("""
+            SELECT
+                Appointments.appointment_id,
+                Appointments.appointment_time,
+                COALESCE(Service_Records.duration, Service_Packages.duration, %s),
+                Service_Records.employee_id
+            FROM Appointments
+            LEFT JOIN Service_Records ON Service_Records.appointment_id = Appointments.appointment_id
+            LEFT JOIN Service_Packages ON Service_Packages.service_package_id = Appointments.service_package_id
+            WHERE Appointments.appointment_date = %s AND Appointments.status <> 'cancelled'
+            ORDER BY Appointments.appointment_id
+        """, (DEFAULT_DURATION, day))
+        seen = set()
+        for appointment_id, start_time, duration, employee_id in cursor.fetchall():
+            start = to_minutes(start_time)
+            # An appointment with several service records takes one bay
+            schedule.add(start, start + int(duration), appointment_id, employee_id,
+                         occupies_bay=appointment_id not in seen)
+            seen.add(appointment_id)
+        schedule.loaded_at = time.monotonic()
+        return schedule
+
+
+availability = AvailabilityIndex()
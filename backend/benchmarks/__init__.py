@@ -0,0 +1,2 @@
+"""Benchmarks: a synthetic data generator (seed), an HTTP load driver (load)
+and micro-benchmarks. Run the modules from backend/ with python -m."""
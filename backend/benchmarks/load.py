@@ -0,0 +1,259 @@
+"""Replay a mix of API calls at a fixed concurrency and report latencies.
+
+    python -m benchmarks.load --url http://localhost:5000 --concurrency 32 --duration 60
+
+Each worker sends one request at a time, picking the route from a weighted
+mix of dashboard polling, list views, search, analytics and scheduling
+writes, and waits for the response before sending the next. The report
+gives requests/s and p50/p95/p99 latency per route.
+
+--in-process drives the Flask app through its test client instead of HTTP,
+which needs no running server. --save writes the results as JSON. With
+--baseline, the run is compared with a saved one and exits non-zero if
+any route's p95 grew by more than --tolerance, so it can gate a deploy.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEARCH_PREFIXES = ["Aa", "Ar", "Di", "Ka", "Me", "Pr", "Ra", "Sa", "Vi", "customer1", "KA1", "TN2", "98"]
+
+
+class Ids:
+    """Ids of existing rows, sampled from the API before the run."""
+
+    def __init__(self, client):
+        self.customers = self._ids(client, "/customers?limit=500", "customer_id")
+        self.vehicles = self._ids(client, "/vehicles?limit=500", "vehicle_id")
+        self.packages = self._ids(client, "/service_packages", "service_package_id")
+        self.employees = self._ids(client, "/employees?active=true&limit=500", "employee_id")
+        self.inventory = self._ids(client, "/inventory?limit=500", "inventory_id")
+
+    @staticmethod
+    def _ids(client, path, key):
+        status, body = client.request("GET", path)
+        if status != 200:
+            raise SystemExit(f"GET {path} returned {status}")
+        return [row[key] for row in json.loads(body)] or [1]
+
+
+def scheduling_body(rng, ids):
+    day = date.today() + timedelta(days=rng.randrange(1, 60))
+    vehicle_id = rng.choice(ids.vehicles)
+    body = {
+        "customer_id": str(rng.choice(ids.customers)),
+        "vehicle_id": str(vehicle_id),
+        "package_id": str(rng.choice(ids.packages)),
+        "employee_id": str(rng.choice(ids.employees)),
+        "appointment_date": day.isoformat(),
+        "appointment_time": f"{rng.randrange(8, 17):02d}:{rng.choice((0, 15, 30, 45)):02d}",
+        "service_details": "Load test booking",
+        "service_duration": rng.choice((30, 45, 60)),
+        "inventory_items": [
+            {"inventory_id": str(rng.choice(ids.inventory)), "quantity": 1}
+            for _ in range(rng.randrange(0, 3))
+        ],
+    }
+    # The frontend wraps the form in a JSON string under "body"
+    return {"body": json.dumps(body)}
+
+
+def analytics_path(rng, ids):
+    end = date.today()
+    start = end - timedelta(days=rng.choice((30, 90, 365)))
+    granularity = rng.choice(("day", "week", "month"))
+    return f"/analytics/appointments?{urlencode({'start': start, 'end': end, 'granularity': granularity})}"
+
+
+def availability_path(rng, ids):
+    day = date.today() + timedelta(days=rng.randrange(0, 30))
+    return f"/availability?{urlencode({'package_id': rng.choice(ids.packages), 'date': day})}"
+
+
+# (name, weight, method, path or path(rng, ids), body(rng, ids) or None)
+SCENARIOS = [
+    ("dashboard", 25, "GET", "/dashboard", None),
+    ("metrics", 5, "GET", "/metrics", None),
+    ("customers", 10, "GET", lambda rng, ids: rng.choice(
+        ["/customers?limit=100", "/customers?limit=100&sort=name"]), None),
+    ("customer_vehicles", 5, "GET", lambda rng, ids: f"/customers/{rng.choice(ids.customers)}/vehicles?limit=100", None),
+    ("vehicles", 5, "GET", "/vehicles?limit=100", None),
+    ("appointments", 10, "GET", lambda rng, ids: rng.choice(
+        ["/appointments?limit=100", "/appointments?limit=100&status=scheduled&sort=appointment_date"]), None),
+    ("inventory", 5, "GET", "/inventory?limit=100", None),
+    ("search", 15, "GET", lambda rng, ids: f"/search?{urlencode({'q': rng.choice(SEARCH_PREFIXES)})}", None),
+    ("analytics", 5, "GET", analytics_path, None),
+    ("availability", 5, "GET", availability_path, None),
+    ("upcoming", 5, "GET", "/upcoming-appointments", None),
+    ("schedule", 5, "POST", "/schedule_appointment", scheduling_body),
+]
+
+
+class HTTPClient:
+    """One keep-alive connection per worker thread."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        try:
+            conn.request(method, path, payload, headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+class InProcessClient:
+    def __init__(self):
+        from app import app
+        self._client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self._client.open(path, method=method, json=body)
+        return response.status_code, response.get_data()
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {}     # scenario -> [ms]
+        self.statuses = {}      # scenario -> {status: count}
+        self._lock = threading.Lock()
+
+    def add(self, name, ms, status):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(ms)
+            counts = self.statuses.setdefault(name, {})
+            counts[status] = counts.get(status, 0) + 1
+
+    def report(self, elapsed):
+        routes = {}
+        for name, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            statuses = self.statuses[name]
+            routes[name] = {
+                "requests": len(samples),
+                "rps": round(len(samples) / elapsed, 2),
+                "errors": sum(count for status, count in statuses.items() if status == "error" or status >= 500),
+                "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+                "p50_ms": round(percentile(samples, 0.50), 2),
+                "p95_ms": round(percentile(samples, 0.95), 2),
+                "p99_ms": round(percentile(samples, 0.99), 2),
+            }
+        total = sum(route["requests"] for route in routes.values())
+        return {"elapsed_s": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 2), "routes": routes}
+
+
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))
+    return sorted_samples[index]
+
+
+def worker(client, ids, scenarios, weights, deadline, warmup_until, results, seed):
+    rng = random.Random(seed)
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            return
+        name, _, method, path, body = rng.choices(scenarios, weights)[0]
+        if callable(path):
+            path = path(rng, ids)
+        payload = body(rng, ids) if body else None
+        started = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, payload)
+        except Exception:
+            status = "error"
+        if started >= warmup_until:
+            results.add(name, (time.perf_counter() - started) * 1000, status)
+
+
+def print_report(report):
+    print(f"{'route':<18} {'reqs':>8} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}  statuses")
+    for name, route in report["routes"].items():
+        statuses = " ".join(f"{status}:{count}" for status, count in route["statuses"].items())
+        print(f"{name:<18} {route['requests']:>8} {route['rps']:>9.1f} {route['p50_ms']:>9.1f} "
+              f"{route['p95_ms']:>9.1f} {route['p99_ms']:>9.1f} {route['errors']:>7}  {statuses}")
+    print(f"total: {report['requests']} requests in {report['elapsed_s']}s, {report['rps']} req/s")
+
+
+def regressions(report, baseline, tolerance):
+    found = []
+    for name, route in report["routes"].items():
+        before = baseline.get("routes", {}).get(name)
+        if before and before["p95_ms"] and route["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            found.append(f"{name}: p95 {before['p95_ms']} ms -> {route['p95_ms']} ms")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--in-process", action="store_true", help="call the Flask app directly instead of over HTTP")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="seconds, including warmup")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds excluded from the results")
+    parser.add_argument("--only", nargs="+", metavar="ROUTE", help="restrict the mix to these routes")
+    parser.add_argument("--no-writes", action="store_true", help="leave out the scheduling writes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="fail if p95 regressed against this saved run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS if (not args.only or s[0] in args.only)
+                 and not (args.no_writes and s[2] != "GET")]
+    if not scenarios:
+        parser.error("no routes left in the mix")
+    weights = [s[1] for s in scenarios]
+
+    client = InProcessClient() if args.in_process else HTTPClient(args.url)
+    ids = Ids(client)
+    results = Results()
+    started = time.perf_counter()
+    warmup_until = started + args.warmup
+    deadline = started + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for i in range(args.concurrency):
+            executor.submit(worker, client, ids, scenarios, weights, deadline, warmup_until, results, args.seed + i)
+    report = results.report(max(args.duration - args.warmup, 0.001))
+    print_report(report)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""Fill the database with deterministic synthetic data.
+
+    python -m benchmarks.seed --customers 1000000 --appointments 5000000 --truncate
+
+Run from backend/ against the database configured in .env. Every table
+created by init_db() is filled; ids are assigned here, so rows can point
+at each other without reading anything back. The same --seed always
+produces the same data.
+
+Rows are streamed in batches, either as multi-row INSERTs (the default)
+or, with --method load-data, through LOAD DATA LOCAL INFILE (needs
+local_infile=ON on the server), which is several times faster at
+millions of rows. Foreign key and unique checks are off during the load.
+With DB_ENGINE=sqlite only the INSERT method is available.
+The derived tables (Row_Counts and the daily rollups) are rebuilt at the
+end.
+"""
+from datetime import date, timedelta
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector  # noqa: E402
+import sqlite_engine  # noqa: E402
+from database import COUNTED_TABLES, DATABASE_NAME, DB_ENGINE, DB_HOST, DB_PASSWORD, DB_USER, init_db  # noqa: E402
+
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Nikhil", "Priya", "Rahul",
+    "Riya", "Rohan", "Sanjay", "Sneha", "Tanvi", "Varun", "Vikram", "Ananya", "Karthik", "Lakshmi",
+    "James", "Maria", "David", "Sarah", "Michael", "Emma", "Daniel", "Olivia", "Lucas", "Sofia",
+]
+LAST_NAMES = [
+    "Sharma", "Iyer", "Reddy", "Nair", "Patel", "Gupta", "Menon", "Rao", "Kumar", "Singh",
+    "Das", "Joshi", "Pillai", "Bose", "Mehta", "Smith", "Johnson", "Brown", "Garcia", "Miller",
+]
+STREETS = ["MG Road", "Anna Salai", "Park Street", "Brigade Road", "Linking Road", "Main Street"]
+STATE_CODES = ["TN", "KA", "KL", "MH", "DL", "AP", "TS", "GJ"]
+PACKAGES = [
+    ("Basic Wash", 25, 30), ("Premium Wash", 45, 45), ("Interior Detailing", 90, 120),
+    ("Exterior Detailing", 110, 120), ("Full Detailing", 200, 240), ("Ceramic Coating", 650, 480),
+    ("Paint Correction", 400, 360), ("Headlight Restoration", 60, 60), ("Engine Bay Cleaning", 70, 60),
+    ("Odor Removal", 80, 90), ("Leather Conditioning", 95, 90), ("Wax & Polish", 120, 120),
+]
+PRODUCTS = ["Car Shampoo", "Microfiber Towel", "Clay Bar", "Wax", "Sealant", "Tire Shine",
+            "Glass Cleaner", "Leather Conditioner", "Polish", "Degreaser", "Ceramic Coat", "Air Freshener"]
+APPOINTMENT_HOURS = range(8, 18)
+
+TABLES = (
+    "Feedback", "ServiceRecord_Inventory", "Inventory_Ledger", "Service_Records", "Appointments",
+    "Vehicles", "Customers", "Employees", "Inventory", "Service_Packages",
+    "Appointment_Daily_Counts", "Package_Daily_Usage", "Inventory_Daily_Usage",
+    "Appointments_Archive", "Service_Records_Archive", "ServiceRecord_Inventory_Archive", "Feedback_Archive",
+    "Change_Events", "Table_Versions",
+)
+
+
+def customers(rng, count):
+    for i in range(1, count + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        yield (
+            i, name, f"customer{i}@example.com", f"9{rng.randrange(10 ** 9):09d}",
+            f"{rng.randrange(1, 500)} {rng.choice(STREETS)}",
+        )
+
+
+def vehicles(rng, count, customer_count):
+    for i in range(1, count + 1):
+        # The first pass gives every customer a vehicle; the rest are random
+        customer_id = i if i <= customer_count else rng.randrange(1, customer_count + 1)
+        plate = f"{STATE_CODES[i % len(STATE_CODES)]}{i % 90 + 10}{_letters(i // 10000)}{i % 10000:04d}"
+        yield (i, customer_id, str(rng.randrange(2005, 2026)), plate)
+
+
+def _letters(n):
+    return chr(65 + n // 26 % 26) + chr(65 + n % 26) + chr(65 + n // 676 % 26)
+
+
+def service_packages(rng, count):
+    for i in range(1, count + 1):
+        name, price, duration = PACKAGES[(i - 1) % len(PACKAGES)]
+        if i > len(PACKAGES):
+            name = f"{name} {i // len(PACKAGES) + 1}"
+        yield (i, name, f"{name} package", f"{price:.2f}", duration)
+
+
+def employees(rng, count):
+    for i in range(1, count + 1):
+        yield (
+            i, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"employee{i}@example.com",
+            f"8{rng.randrange(10 ** 9):09d}", 1 if rng.random() < 0.9 else 0,
+        )
+
+
+def inventory(rng, count):
+    for i in range(1, count + 1):
+        product = PRODUCTS[(i - 1) % len(PRODUCTS)]
+        if i > len(PRODUCTS):
+            product = f"{product} #{i // len(PRODUCTS) + 1}"
+        yield (i, product, rng.randrange(0, 1000), rng.choice((10, 20, 50)))
+
+
+def appointments(rng, count, vehicle_count, package_count, days):
+    """Appointments spread over the past `days` days plus the next 30."""
+    today = date.today()
+    for i in range(1, count + 1):
+        offset = rng.randrange(-days, 30)
+        day = today + timedelta(days=offset)
+        if offset >= 0:
+            status = "scheduled"
+        else:
+            status = "cancelled" if rng.random() < 0.08 else "completed"
+        yield (
+            i, rng.randrange(1, vehicle_count + 1), rng.randrange(1, package_count + 1),
+            day.isoformat(), f"{rng.choice(APPOINTMENT_HOURS):02d}:{rng.choice((0, 15, 30, 45)):02d}:00",
+            status,
+        )
+
+
+def service_records(rng, appointment_count, employee_count):
+    # One record per appointment, sharing its id
+    for i in range(1, appointment_count + 1):
+        yield (i, i, rng.randrange(1, employee_count + 1), "Routine service", rng.choice((30, 45, 60, 90, 120)))
+
+
+def service_record_inventory(rng, record_count, inventory_count, items_per_record):
+    for record_id in range(1, record_count + 1):
+        items = min(inventory_count, int(rng.expovariate(1 / items_per_record))) if items_per_record else 0
+        for inventory_id in rng.sample(range(1, inventory_count + 1), items):
+            yield (record_id, inventory_id, rng.randrange(1, 4))
+
+
+def feedback(rng, appointment_count, customer_count, ratio):
+    feedback_id = 0
+    for appointment_id in range(1, appointment_count + 1):
+        if rng.random() < ratio:
+            feedback_id += 1
+            yield (
+                feedback_id, appointment_id, rng.randrange(1, customer_count + 1),
+                rng.choices((1, 2, 3, 4, 5), weights=(2, 3, 10, 35, 50))[0], "Good service",
+            )
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _tsv_value(value):
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def load(conn, table, columns, rows, method, batch_size):
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    total = 0
+    try:
+        for batch in _batches(rows, batch_size):
+            if method == "load-data":
+                with tempfile.NamedTemporaryFile("w", suffix=".tsv", delete=False, encoding="utf-8") as f:
+                    for row in batch:
+                        f.write("\t".join(_tsv_value(value) for value in row) + "\n")
+                try:
+                    cursor.execute(
+                        f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+                        f"CHARACTER SET utf8mb4 ({', '.join(columns)})",
+                        (f.name,)
+                    )
+                finally:
+                    os.unlink(f.name)
+            else:
+                placeholders = ", ".join(["%s"] * len(columns))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", batch
+                )
+            conn.commit()
+            total += len(batch)
+    finally:
+        cursor.close()
+    elapsed = time.perf_counter() - started
+    print(f"{table:<26} {total:>12,} rows {elapsed:8.1f}s {total / elapsed if elapsed else 0:>12,.0f} rows/s")
+    return total
+
+
+def rebuild_derived(conn):
+    """Recompute what the writers in models.py normally maintain."""
+    cursor = conn.cursor()
+    try:
+        for table in COUNTED_TABLES + ("Appointments_Archive",):
+            cursor.execute(
+                f"REPLACE INTO Row_Counts (table_name, row_count) SELECT %s, COUNT(*) FROM {table}", (table,)
+            )
+        cursor.execute("""
+            INSERT INTO Appointment_Daily_Counts (day, appointments)
+            SELECT appointment_date, COUNT(*) FROM Appointments GROUP BY appointment_date
+        """)
+        cursor.execute("""
+            INSERT INTO Package_Daily_Usage (day, service_package_id, appointments)
+            SELECT appointment_date, service_package_id, COUNT(*) FROM Appointments
+            WHERE service_package_id IS NOT NULL
+            GROUP BY appointment_date, service_package_id
+        """)
+        cursor.execute("""
+            INSERT INTO Inventory_Daily_Usage (day, inventory_id, quantity_used)
+            SELECT Appointments.appointment_date, ServiceRecord_Inventory.inventory_id,
+                   SUM(ServiceRecord_Inventory.quantity_used)
+            FROM ServiceRecord_Inventory
+            JOIN Service_Records ON ServiceRecord_Inventory.service_record_id = Service_Records.service_record_id
+            JOIN Appointments ON Service_Records.appointment_id = Appointments.appointment_id
+            GROUP BY Appointments.appointment_date, ServiceRecord_Inventory.inventory_id
+        """)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--vehicles", type=int, help="default: 1.5 per customer")
+    parser.add_argument("--appointments", type=int, help="default: 5 per customer")
+    parser.add_argument("--employees", type=int, default=50)
+    parser.add_argument("--packages", type=int, default=len(PACKAGES))
+    parser.add_argument("--inventory", type=int, default=200)
+    parser.add_argument("--items-per-record", type=float, default=1.5, help="mean inventory lines per service record")
+    parser.add_argument("--feedback-ratio", type=float, default=0.3)
+    parser.add_argument("--days", type=int, default=730, help="history length in days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--method", choices=("insert", "load-data"), default="insert")
+    parser.add_argument("--truncate", action="store_true", help="empty the tables first")
+    args = parser.parse_args(argv)
+
+    vehicle_count = args.vehicles if args.vehicles is not None else args.customers * 3 // 2
+    appointment_count = args.appointments if args.appointments is not None else args.customers * 5
+    rng = random.Random(args.seed)
+
+    if DB_ENGINE == "sqlite" and args.method == "load-data":
+        parser.error("--method load-data needs MySQL")
+
+    init_db()
+    if DB_ENGINE == "sqlite":
+        conn = sqlite_engine.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA foreign_keys = OFF")
+    else:
+        conn = mysql.connector.connect(
+            host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DATABASE_NAME,
+            allow_local_infile=args.method == "load-data",
+        )
+        cursor = conn.cursor()
+        cursor.execute("SET foreign_key_checks = 0")
+        cursor.execute("SET unique_checks = 0")
+    if args.truncate:
+        for table in TABLES:
+            cursor.execute(f"DELETE FROM {table}" if DB_ENGINE == "sqlite" else f"TRUNCATE TABLE {table}")
+        conn.commit()
+    else:
+        cursor.execute("SELECT COUNT(*) FROM Customers")
+        if cursor.fetchone()[0]:
+            sys.exit("Customers is not empty; pass --truncate to replace the existing data")
+    cursor.close()
+
+    started = time.perf_counter()
+    method, size = args.method, args.batch_size
+    load(conn, "Service_Packages", ("service_package_id", "package_name", "package_description", "price", "duration"),
+         service_packages(rng, args.packages), method, size)
+    load(conn, "Employees", ("employee_id", "name", "email", "phone", "is_active"),
+         employees(rng, args.employees), method, size)
+    load(conn, "Inventory", ("inventory_id", "product_name", "quantity", "reorder_level"),
+         inventory(rng, args.inventory), method, size)
+    load(conn, "Customers", ("customer_id", "name", "email", "phone", "address"),
+         customers(rng, args.customers), method, size)
+    load(conn, "Vehicles", ("vehicle_id", "customer_id", "model_year", "license_plate"),
+         vehicles(rng, vehicle_count, args.customers), method, size)
+    load(conn, "Appointments",
+         ("appointment_id", "vehicle_id", "service_package_id", "appointment_date", "appointment_time", "status"),
+         appointments(rng, appointment_count, vehicle_count, args.packages, args.days), method, size)
+    load(conn, "Service_Records", ("service_record_id", "appointment_id", "employee_id", "details", "duration"),
+         service_records(rng, appointment_count, args.employees), method, size)
+    load(conn, "ServiceRecord_Inventory", ("service_record_id", "inventory_id", "quantity_used"),
+         service_record_inventory(rng, appointment_count, args.inventory, args.items_per_record), method, size)
+    load(conn, "Feedback", ("feedback_id", "appointment_id", "customer_id", "rating", "comments"),
+         feedback(rng, appointment_count, args.customers, args.feedback_ratio), method, size)
+    rebuild_derived(conn)
+    conn.close()
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare the old and new ways of turning an appointments page into JSON.
+
+    python benchmarks/serialization.py [rows]
+
+"old" is what /appointments did before: dictionary-cursor rows, a Python
+loop converting dates and times in place, then jsonify. "new" is Rows
+handed to the app's JSON provider. Neither needs a database; the rows are
+generated with the same column types MySQL reports for the query.
+"""
+from datetime import date, timedelta
+from mysql.connector import FieldType
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify  # noqa: E402
+from serialization import JSONProvider, Rows  # noqa: E402
+
+DESCRIPTION = [
+    ("appointment_id", FieldType.LONG),
+    ("vehicle_id", FieldType.LONG),
+    ("service_package_id", FieldType.LONG),
+    ("appointment_date", FieldType.DATE),
+    ("appointment_time", FieldType.TIME),
+    ("status", FieldType.STRING),
+    ("license_plate", FieldType.VAR_STRING),
+    ("package_name", FieldType.VAR_STRING),
+]
+COLUMNS = [column[0] for column in DESCRIPTION]
+
+
+def make_rows(count):
+    start = date(2024, 1, 1)
+    return [
+        (
+            i, i % 5000 + 1, i % 12 + 1,
+            start + timedelta(days=i % 365), timedelta(hours=8 + i % 10, minutes=15 * (i % 4)),
+            ("scheduled", "completed", "cancelled")[i % 3],
+            f"KA{i % 100:02d}AB{i % 10000:04d}", f"Package {i % 12 + 1}",
+        )
+        for i in range(count)
+    ]
+
+
+def old(app, rows):
+    appointments = [dict(zip(COLUMNS, row)) for row in rows]
+    for appointment in appointments:
+        if isinstance(appointment['appointment_date'], date):
+            appointment['appointment_date'] = appointment['appointment_date'].strftime('%Y-%m-%d')
+        if isinstance(appointment['appointment_time'], timedelta):
+            total_seconds = appointment['appointment_time'].total_seconds()
+            hours = int(total_seconds // 3600)
+            minutes = int((total_seconds % 3600) // 60)
+            appointment['appointment_time'] = f"{hours:02d}:{minutes:02d}"
+    with app.app_context():
+        return jsonify([dict(row) for row in appointments]).get_data()
+
+
+def new(app, rows):
+    with app.app_context():
+        return jsonify(Rows(DESCRIPTION, rows)).get_data()
+
+
+def best_of(func, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), body
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = make_rows(count)
+    old_app = Flask(__name__)
+    new_app = Flask(__name__)
+    new_app.json = JSONProvider(new_app)
+
+    old_time, old_body = best_of(old, old_app, rows)
+    new_time, new_body = best_of(new, new_app, rows)
+    print(f"{count} rows")
+    print(f"old: {old_time * 1000:8.1f} ms  {len(old_body)} bytes")
+    print(f"new: {new_time * 1000:8.1f} ms  {len(new_body)} bytes")
+    print(f"speedup: {old_time / new_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
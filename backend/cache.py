@@ -0,0 +1,283 @@
+"""Result cache for the aggregate queries in models.py.
+
+Cached functions declare the tables they read; writers call invalidate()
+with the tables they changed once their transaction has committed, which
+drops every entry tagged with one of those tables. Entries also expire
+after CACHE_TTL seconds, which bounds staleness for anything the tags do
+not capture (e.g. CURDATE() rolling over at midnight).
+
+The default backend is an in-process LRU. With several workers each
+process has its own copy and only sees its own writes; sync() catches up
+with the others' by dropping the entries for tables whose shared version
+(Table_Versions) has moved since this process last looked. Set
+CACHE_BACKEND=sqlite to share one cache file between all workers on the
+host instead.
+"""
+from collections import OrderedDict
+from dotenv import load_dotenv
+import copy
+import functools
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+load_dotenv()
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_PATH = os.getenv("CACHE_PATH", "query_cache.sqlite")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+
+_MISS = object()
+
+
+class MemoryBackend:
+    """Thread-safe LRU with per-entry expiry and a tag -> keys index."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (value, expires_at, tags)
+        self._tags = {}                 # tag -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISS
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return _MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tags, ttl):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SQLiteBackend:
+    """The same interface over a local SQLite file shared by every worker process."""
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript('''
+        CREATE TABLE IF NOT EXISTS cache_entries (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS cache_tags (
+            tag TEXT NOT NULL,
+            key TEXT NOT NULL,
+            PRIMARY KEY (tag, key)
+        );
+        CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries (accessed_at);
+        ''')
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return _MISS
+        if row[1] <= now:
+            self._delete(conn, [key])
+            return _MISS
+        conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def set(self, key, value, tags, ttl):
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value), now + ttl, now)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags]
+            )
+            stale = conn.execute(
+                "SELECT key FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?",
+                (self.max_entries,)
+            ).fetchall()
+            self._delete(conn, [row[0] for row in stale])
+
+    def invalidate(self, tags):
+        if not tags:
+            return
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            placeholders = ", ".join("?" * len(tags))
+            keys = conn.execute(
+                f"SELECT DISTINCT key FROM cache_tags WHERE tag IN ({placeholders})", tuple(tags)
+            ).fetchall()
+            self._delete(conn, [row[0] for row in keys])
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cache_entries")
+            conn.execute("DELETE FROM cache_tags")
+
+    def size(self):
+        return self._conn().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def _delete(self, conn, keys):
+        for key in keys:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            conn.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+
+
+class QueryCache:
+    def __init__(self, backend, ttl=CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._listeners = []
+        self._versions = {}     # table -> last version seen by sync()
+        self._generations = {}  # table -> invalidations seen by this process
+        self._generation_lock = threading.Lock()
+
+    def cached(self, *tables):
+        """Cache a model function's result, tagged with the tables it reads."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = repr((func.__name__, args, sorted(kwargs.items())))
+                value = self.backend.get(key)
+                with self._stats_lock:
+                    if value is _MISS:
+                        self.misses += 1
+                    else:
+                        self.hits += 1
+                if value is _MISS:
+                    generations = self._generations_of(tables)
+                    value = func(*args, **kwargs)
+                    # If a write invalidated these tables while the result was
+                    # being read, it may predate the write; don't keep it
+                    with self._generation_lock:
+                        if self._generations_of(tables) == generations:
+                            self.backend.set(key, value, tables, self.ttl)
+                # Hand out copies so callers cannot mutate the cached rows
+                return copy.deepcopy(value)
+            wrapper.uncached = func
+            return wrapper
+        return decorator
+
+    def on_invalidate(self, listener):
+        """Call listener(tables) after every invalidation."""
+        self._listeners.append(listener)
+        return listener
+
+    def invalidate(self, *tables):
+        self._drop(tables)
+        with self._stats_lock:
+            self.invalidations += 1
+        for listener in self._listeners:
+            listener(tables)
+
+    def sync(self, versions):
+        """Drop entries for tables whose version differs from the last one seen.
+
+        `versions` maps table names to their shared change versions. Calling
+        this before serving a result read under those versions means an
+        entry filled before another worker's write is not served again.
+        """
+        with self._stats_lock:
+            moved = [table for table, version in versions.items() if self._versions.get(table) != version]
+            self._versions.update(versions)
+        if moved:
+            self._drop(moved)
+
+    def _generations_of(self, tables):
+        return [self._generations.get(table, 0) for table in tables]
+
+    def _drop(self, tables):
+        # Under the same lock as the check before set(), so a result read
+        # before this invalidation cannot be stored after it
+        with self._generation_lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self.backend.invalidate(tables)
+
+    def stats(self):
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'entries': self.backend.size(),
+                'max_entries': self.backend.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+            }
+
+
+def _make_backend():
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteBackend()
+    return MemoryBackend()
+
+
+query_cache = QueryCache(_make_backend())
+cached = query_cache.cached
+invalidate = query_cache.invalidate
+on_invalidate = query_cache.on_invalidate
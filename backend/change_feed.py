@@ -0,0 +1,248 @@
+"""Server-sent change feed.
+
+Write paths in models.py append typed events to Change_Events in the
+same transaction as the change itself, so an event is published exactly
+when its change commits. Each worker process runs one thread that reads
+new events from that table and fans each one out, encoded once, to every
+/events stream connected to the process. Reading from the table means
+events written by other workers reach this worker's streams too. A write
+made by this process wakes the thread at once; writes made by other
+processes are picked up within CHANGE_FEED_POLL seconds.
+
+Every event carries its event_id as the SSE id, so a client that
+reconnects with Last-Event-ID is sent what it missed from the table. The
+table keeps the last CHANGE_FEED_RETENTION events. A client that falls
+further behind, or whose stream overflows its buffer, gets a `reset` event
+and should reload everything.
+"""
+from collections import deque
+from database import get_db_connection
+from dotenv import load_dotenv
+import os
+import threading
+import time
+
+load_dotenv()
+
+CHANGE_FEED_POLL = float(os.getenv("CHANGE_FEED_POLL", "1"))                # seconds
+CHANGE_FEED_HEARTBEAT = float(os.getenv("CHANGE_FEED_HEARTBEAT", "15"))     # seconds
+CHANGE_FEED_BUFFER = int(os.getenv("CHANGE_FEED_BUFFER", "1000"))           # events queued per stream
+CHANGE_FEED_RETENTION = int(os.getenv("CHANGE_FEED_RETENTION", "10000"))    # events kept for replay
+REPLAY_LIMIT = 1000
+GAP_TIMEOUT = 10        # seconds to keep looking for an event whose id was skipped
+PRUNE_EVERY = 60        # polls between prunes
+
+EVENT_TYPES = (
+    "appointment.scheduled",
+    "appointment.status_changed",
+    "inventory.updated",
+    "inventory.low_stock",
+    "tables.changed",
+)
+
+RESET = b"event: reset\ndata: {}\n\n"
+HEARTBEAT = b": keep-alive\n\n"
+
+
+class Event:
+    __slots__ = ("id", "type", "message")
+
+    def __init__(self, event_id, event_type, payload):
+        self.id = event_id
+        self.type = event_type
+        if isinstance(payload, (bytes, bytearray)):
+            payload = payload.decode()
+        self.message = f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode()
+
+
+class Subscription:
+    """The queue of one connected stream."""
+
+    def __init__(self, types=None):
+        self.types = frozenset(types) if types else None
+        self._events = deque()
+        self._ready = threading.Condition()
+        self.overflowed = False
+
+    def push(self, event):
+        with self._ready:
+            if len(self._events) >= CHANGE_FEED_BUFFER:
+                self.overflowed = True
+            else:
+                self._events.append(event)
+            self._ready.notify()
+
+    def get(self, timeout):
+        """Queued events; [] after `timeout` seconds without any, None once overflowed."""
+        with self._ready:
+            if not self._events and not self.overflowed:
+                self._ready.wait(timeout)
+            if self.overflowed:
+                return None
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+
+class ChangeFeed:
+    def __init__(self, poll=CHANGE_FEED_POLL):
+        self.poll = poll
+        self._subscriptions = set()
+        self._lock = threading.Condition()
+        self._woken = False
+        self._thread = None
+        self._last_id = 0
+        self._gaps = {}         # skipped event_id -> monotonic time it was first missed
+
+    def subscribe(self, types=None):
+        """Stream events committed from now on; replay() covers the ones before."""
+        subscription = Subscription(types)
+        # Held while the poller reads and fans out, so a new subscription
+        # sees either all of a batch or none of it and never a resume point
+        # taken halfway through one
+        with self._lock:
+            # Nothing is read while nobody is listening, so the first
+            # subscriber starts the feed again from the newest event
+            if not self._subscriptions:
+                self._last_id = self._newest_id()
+                self._gaps.clear()
+            self._subscriptions.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+                self._thread.start()
+            self._lock.notify()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def wake(self):
+        """Read new events now rather than at the next poll."""
+        with self._lock:
+            self._woken = True
+            self._lock.notify()
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscriptions), 'last_event_id': self._last_id}
+
+    def replay(self, after_id, types=None):
+        """(events after `after_id`, complete) from the table, oldest first.
+
+        complete is False when events the client missed have already been
+        pruned or there are more than REPLAY_LIMIT of them.
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT MIN(event_id) FROM Change_Events")
+            oldest = cursor.fetchone()[0]
+            if oldest is None:
+                return [], True
+            cursor.execute("""
+                SELECT event_id, event_type, payload FROM Change_Events
+                WHERE event_id > %s
+                ORDER BY event_id
+                LIMIT %s
+            """, (after_id, REPLAY_LIMIT))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+        complete = oldest <= after_id + 1 and len(rows) < REPLAY_LIMIT
+        return [Event(*row) for row in rows if not types or row[1] in types], complete
+
+    def _run(self):
+        polls = 0
+        while True:
+            with self._lock:
+                while not self._subscriptions:
+                    self._lock.wait()
+                if not self._woken:
+                    self._lock.wait(self.poll)
+                self._woken = False
+                if not self._subscriptions:
+                    continue
+                try:
+                    events = self._read()
+                except Exception as e:
+                    print(f"Change feed poll failed: {e}")
+                    events = None
+                else:
+                    for event in events:
+                        for subscription in self._subscriptions:
+                            if subscription.types is None or event.type in subscription.types:
+                                subscription.push(event)
+                last_id = self._last_id
+            if events is None:
+                time.sleep(self.poll)
+                continue
+            polls += 1
+            if polls % PRUNE_EVERY == 0:
+                try:
+                    self._prune(last_id)
+                except Exception as e:
+                    print(f"Change feed prune failed: {e}")
+
+    def _newest_id(self):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COALESCE(MAX(event_id), 0) FROM Change_Events")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _read(self):
+        """New events since _last_id; call with the lock held."""
+        conn = get_db_connection()
+        cursor = conn.cursor(prepared=True)
+        try:
+            cursor.execute("""
+                SELECT event_id, event_type, payload FROM Change_Events
+                WHERE event_id > %s
+                ORDER BY event_id
+                LIMIT %s
+            """, (self._last_id, REPLAY_LIMIT))
+            rows = cursor.fetchall()
+            # Ids are handed out when a transaction inserts its event, but
+            # transactions can commit out of order, so an id skipped now may
+            # still show up; look for it again for GAP_TIMEOUT seconds
+            now = time.monotonic()
+            self._gaps = {event_id: missed for event_id, missed in self._gaps.items() if now - missed < GAP_TIMEOUT}
+            if self._gaps:
+                gaps = sorted(self._gaps)
+                cursor.execute(f"""
+                    SELECT event_id, event_type, payload FROM Change_Events
+                    WHERE event_id IN ({", ".join(["%s"] * len(gaps))})
+                """, tuple(gaps))
+                late = cursor.fetchall()
+                for row in late:
+                    del self._gaps[row[0]]
+                rows = late + rows
+        finally:
+            cursor.close()
+            conn.close()
+        expected = self._last_id + 1
+        for event_id, _, _ in rows:
+            if event_id >= expected:
+                for skipped in range(expected, min(event_id, expected + REPLAY_LIMIT)):
+                    self._gaps[skipped] = now
+                expected = event_id + 1
+        self._last_id = expected - 1
+        return [Event(*row) for row in rows]
+
+    def _prune(self, last_id):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM Change_Events WHERE event_id <= %s", (last_id - CHANGE_FEED_RETENTION,))
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,46 @@
+"""Response compression.
+
+JSON and CSV responses of at least COMPRESS_MIN_SIZE bytes are compressed
+with the best encoding the client accepts: brotli when the Brotli package
+is installed, otherwise gzip. Streamed responses (exports, the /events
+feed) are left alone, since they are sent as they are produced.
+"""
+from dotenv import load_dotenv
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+load_dotenv()
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))   # bytes
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))            # gzip level, 1-9
+BROTLI_QUALITY = 5      # 0-11; above ~5 costs far more CPU for little gain on JSON
+
+COMPRESSIBLE_TYPES = {"application/json", "text/csv", "application/x-ndjson"}
+ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress_response(response, accept_encodings):
+    """Compress `response` in place for a client sending `accept_encodings`."""
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or response.mimetype not in COMPRESSIBLE_TYPES or 'Content-Encoding' in response.headers):
+        return response
+    # Caches must keep the compressed and plain bodies apart, small ones included
+    response.vary.add('Accept-Encoding')
+    if response.content_length is None or response.content_length < COMPRESS_MIN_SIZE:
+        return response
+    encoding = accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if encoding == "br":
+        data = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        data = gzip.compress(data, COMPRESS_LEVEL, mtime=0)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -1,21 +1,50 @@
+from collections import OrderedDict
 from dotenv import load_dotenv
+from flask import g, has_app_context
+import functools
 import os
+import sqlite3
+import threading
+import time
 import mysql.connector
+import sqlite_engine
+from migrations import LATEST_VERSION, run_migrations
+from instrumentation import DB_STATS, InstrumentedCursor, record_acquire
 
 load_dotenv()
 
 DATABASE_NAME = os.getenv("DATABASE_NAME")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = int(os.getenv("DB_PORT", "3306"))
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+# "mysql", or "sqlite" for a single-file database at SQLITE_PATH
+DB_ENGINE = os.getenv("DB_ENGINE", "mysql").lower()
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))          # seconds to wait for a free connection
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "1800"))       # close connections older than this
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", "30"))  # ping connections idle longer than this
+# Server-side prepared statements kept open per pooled connection; 0 disables them
+DB_PREPARED_STATEMENTS = int(os.getenv("DB_PREPARED_STATEMENTS", "100"))
+
+# Read replicas as comma-separated host[:port], with the primary's user,
+# password and database. Reads that opt in with readonly=True go to them.
+DB_REPLICAS = [address.strip() for address in os.getenv("DB_REPLICAS", "").split(",") if address.strip()]
+DB_REPLICA_STICKY = float(os.getenv("DB_REPLICA_STICKY", "2"))      # seconds reads stay on the primary after a write
+DB_REPLICA_RETRY = float(os.getenv("DB_REPLICA_RETRY", "30"))       # seconds an unreachable replica is skipped
+
+# Tables whose row totals are tracked in Row_Counts
+COUNTED_TABLES = ("Customers", "Vehicles", "Appointments", "Inventory")
+
 def init_db():
-    """Initializes the database only if tables are missing (MySQL version)."""
-    connection = mysql.connector.connect(
-        host='localhost',
-        user=DB_USER,
-        password=DB_PASSWORD,   
-        database=DATABASE_NAME        
-    )
+    """Initializes the database only if tables are missing (MySQL version; see sqlite_engine for SQLite)."""
+    if DB_ENGINE == "sqlite":
+        sqlite_engine.init_db()
+        return
+    connection = _connect()
     cursor = connection.cursor()
 
     # Create Customers table
@@ -133,16 +162,473 @@ def init_db():
     )
     ''')
 
+    # Create Row_Counts table: row totals kept up to date by the writers in
+    # models.py so /metrics does not have to count whole tables
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Row_Counts (
+        table_name VARCHAR(64) PRIMARY KEY,
+        row_count BIGINT NOT NULL
+    )
+    ''')
+    for table in COUNTED_TABLES:
+        cursor.execute(
+            f"INSERT IGNORE INTO Row_Counts (table_name, row_count) SELECT %s, COUNT(*) FROM {table}",
+            (table,)
+        )
+
     connection.commit()
     cursor.close()
+    run_migrations(connection)
     connection.close()
     print("Database initialized (only missing tables were created).")
 
-def get_db_connection():
-    conn = mysql.connector.connect(
-        host='localhost',
+_db_ready = False
+_db_ready_lock = threading.Lock()
+
+def schema_is_current(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM Schema_Migrations")
+        return cursor.fetchone()[0] >= LATEST_VERSION
+    except (mysql.connector.ProgrammingError, sqlite3.OperationalError):
+        # Schema_Migrations does not exist yet
+        return False
+    finally:
+        cursor.close()
+
+def ensure_db():
+    """Run init_db() once per process, and only if the schema is behind.
+
+    When the stored schema version is current this costs one indexed
+    lookup on the first call and nothing afterwards.
+    """
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_ready_lock:
+        if _db_ready:
+            return
+        conn = get_db_connection()
+        try:
+            current = schema_is_current(conn)
+        finally:
+            conn.close()
+        if not current:
+            init_db()
+        _db_ready = True
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free within DB_POOL_TIMEOUT."""
+
+
+def _connect(host=DB_HOST, port=DB_PORT):
+    return mysql.connector.connect(
+        host=host,
+        port=port,
         user=DB_USER,
-        password=DB_PASSWORD,   
-        database=DATABASE_NAME        
+        password=DB_PASSWORD,
+        database=DATABASE_NAME
     )
-    return conn
\ No newline at end of file
+
+
+class ConnectionPool:
+    """Fixed-size pool of MySQL connections.
+
+    Connections are opened lazily up to `size`. On checkout a connection is
+    recycled if it is older than `recycle` seconds and pinged if it has been
+    idle longer than `ping_interval`, so stale sockets are replaced instead of
+    failing the query. When every connection is in use, callers wait up to
+    `timeout` seconds before PoolTimeoutError is raised.
+    """
+
+    def __init__(self, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 recycle=DB_POOL_RECYCLE, ping_interval=DB_POOL_PING_INTERVAL,
+                 prepared_statements=DB_PREPARED_STATEMENTS, connect=None):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.prepared_statements = prepared_statements
+        self._connect = connect or _connect
+        self._idle = []         # [(raw_connection, created_at, last_used_at)]
+        self._created_at = {}   # id(raw_connection) -> created_at
+        self._statements = {}   # id(raw_connection) -> PreparedStatements
+        self._open_count = 0
+        self._lock = threading.Condition()
+
+    def acquire(self, timeout=None):
+        started = time.perf_counter()
+        conn = self._acquire(timeout)
+        record_acquire(time.perf_counter() - started)
+        return conn
+
+    def _acquire(self, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                while not self._idle and self._open_count >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No database connection available after {timeout} seconds "
+                            f"(pool size {self.size})"
+                        )
+                    self._lock.wait(remaining)
+                if self._idle:
+                    conn, created_at, last_used_at = self._idle.pop()
+                else:
+                    conn = None
+                    self._open_count += 1
+
+            if conn is None:
+                return PooledConnection(self, self._open())
+            if self._is_usable(conn, created_at, last_used_at):
+                return PooledConnection(self, conn)
+            self._discard(conn)
+
+    def release(self, conn):
+        try:
+            # End any transaction left open so the next borrower starts clean
+            # and does not keep reading from an old snapshot.
+            conn.rollback()
+        except mysql.connector.Error:
+            self._discard(conn)
+            return
+        with self._lock:
+            self._idle.append((conn, self._created_at[id(conn)], time.monotonic()))
+            self._lock.notify()
+
+    def in_use(self):
+        with self._lock:
+            return self._open_count - len(self._idle)
+
+    def statements(self, conn):
+        """The prepared statements kept open on one of this pool's connections."""
+        return self._statements[id(conn)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._open_count,
+                'idle': len(self._idle),
+                'prepared_statements': sum(len(statements) for statements in self._statements.values()),
+            }
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._open_count -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._created_at[id(conn)] = time.monotonic()
+            self._statements[id(conn)] = PreparedStatements(conn, self.prepared_statements)
+        return conn
+
+    def _is_usable(self, conn, created_at, last_used_at):
+        now = time.monotonic()
+        if self.recycle and now - created_at > self.recycle:
+            return False
+        if self.ping_interval and now - last_used_at > self.ping_interval:
+            try:
+                conn.ping(reconnect=False)
+            except mysql.connector.Error:
+                return False
+        return True
+
+    def _discard(self, conn):
+        # Closing the connection deallocates its prepared statements on the
+        # server, so the handles are only dropped here
+        with self._lock:
+            self._created_at.pop(id(conn), None)
+            self._statements.pop(id(conn), None)
+            self._open_count -= 1
+            self._lock.notify()
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+
+class PooledConnection:
+    """Proxy around a raw connection whose close() returns it to the pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, prepared=False, **kwargs):
+        if prepared and self._pool.prepared_statements:
+            cursor = PreparedCursor(self._pool.statements(self._conn), kwargs.get('dictionary', False))
+        else:
+            cursor = self._conn.cursor(*args, **kwargs)
+        return InstrumentedCursor(cursor) if DB_STATS else cursor
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+class PreparedStatements:
+    """The server-side prepared statements open on one connection.
+
+    Each distinct SQL text gets its own prepared cursor, which keeps the
+    statement handle for as long as the cursor stays open. The `size`
+    most recently used are kept; older ones are closed, which deallocates
+    them on the server.
+    """
+
+    def __init__(self, conn, size):
+        self._conn = conn
+        self.size = size
+        self._cursors = OrderedDict()   # (sql, dictionary) -> (sql, prepared cursor)
+
+    def __len__(self):
+        return len(self._cursors)
+
+    def get(self, sql, dictionary=False):
+        """(sql, cursor) for the statement; execute it with the returned sql.
+
+        The prepared cursor re-prepares whenever it is given a different
+        string object, even one with the same text, so the string it was
+        prepared with is handed back too.
+        """
+        key = (sql, dictionary)
+        entry = self._cursors.get(key)
+        if entry is not None:
+            self._cursors.move_to_end(key)
+            return entry
+        entry = self._cursors[key] = (sql, self._conn.cursor(prepared=True, dictionary=dictionary))
+        if len(self._cursors) > self.size:
+            _, (_, evicted) = self._cursors.popitem(last=False)
+            evicted.close()
+        return entry
+
+
+class PreparedCursor:
+    """Cursor that runs each statement through the connection's prepared statements.
+
+    It takes the same SQL and %s parameters as a plain cursor, so a query
+    opts in with conn.cursor(prepared=True). Rows come back over the
+    binary protocol in the same Python types. close() costs no round
+    trip and leaves the statements open for the next borrower of the
+    connection, so queries using it must read their whole result.
+    """
+
+    def __init__(self, statements, dictionary=False):
+        self._statements = statements
+        self._dictionary = dictionary
+        self._cursor = None
+
+    def __getattr__(self, name):
+        if self._cursor is None:
+            raise AttributeError(name)
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor.fetchall())
+
+    def execute(self, operation, params=None):
+        sql, self._cursor = self._statements.get(operation, self._dictionary)
+        self._cursor.execute(sql, params)
+
+    def close(self):
+        self._cursor = None
+
+
+class RequestConnection:
+    """The connection borrowed for the current request.
+
+    models.py closes its connection after every call; while a request is
+    active that close() is a no-op and the connection goes back to the pool
+    once, in the app-context teardown.
+    """
+
+    def __init__(self, pooled):
+        self._pooled = pooled
+
+    def __getattr__(self, name):
+        return getattr(self._pooled, name)
+
+    def close(self):
+        pass
+
+
+class ReplicaSet:
+    """The read replicas, each with its own pool.
+
+    Reads go to the replica with the fewest connections in use, taking
+    turns between replicas that are equally busy. A replica whose pool is
+    full is passed over for the next one, and a replica that cannot be
+    reached is skipped for DB_REPLICA_RETRY seconds; with none left, reads
+    fall back to the primary.
+    """
+
+    def __init__(self, addresses):
+        self.addresses = addresses
+        self.pools = []
+        for address in addresses:
+            host, _, port = address.partition(":")
+            self.pools.append(ConnectionPool(connect=functools.partial(_connect, host, int(port or 3306))))
+        self._down_until = [0.0] * len(addresses)
+        self._next = 0
+        self._last_write = float("-inf")
+        self._lock = threading.Lock()
+
+    def note_write(self):
+        self._last_write = time.monotonic()
+
+    def recently_written(self):
+        """True shortly after a write, while the replicas may not have it yet."""
+        return time.monotonic() - self._last_write < DB_REPLICA_STICKY
+
+    def acquire(self):
+        """A pooled connection to a replica, or None if none is reachable."""
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.pools)
+        now = time.monotonic()
+        order = [(start + offset) % len(self.pools) for offset in range(len(self.pools))]
+        # sorted() is stable, so equally busy replicas keep their turn order
+        candidates = sorted(
+            (index for index in order if self._down_until[index] <= now),
+            key=lambda index: self.pools[index].in_use()
+        )
+        for index in candidates:
+            try:
+                # Don't wait on a busy replica while another one, or the
+                # primary, may have a connection free
+                return self.pools[index].acquire(timeout=0)
+            except PoolTimeoutError:
+                continue
+            except mysql.connector.Error as e:
+                print(f"Replica {self.addresses[index]} is unreachable, skipping it for {DB_REPLICA_RETRY} seconds: {e}")
+                self._down_until[index] = time.monotonic() + DB_REPLICA_RETRY
+        return None
+
+    def stats(self):
+        now = time.monotonic()
+        return [
+            dict(pool.stats(), address=address, up=down_until <= now)
+            for address, pool, down_until in zip(self.addresses, self.pools, self._down_until)
+        ]
+
+
+_pool = None
+_replicas = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_replicas():
+    """The ReplicaSet, or None when DB_REPLICAS is not set."""
+    global _replicas
+    if _replicas is None and DB_REPLICAS and DB_ENGINE == "mysql":
+        with _pool_lock:
+            if _replicas is None:
+                _replicas = ReplicaSet(DB_REPLICAS)
+    return _replicas
+
+
+def note_write():
+    """Keep this request's reads, and briefly every read, on the primary."""
+    replicas = get_replicas()
+    if replicas is None:
+        return
+    replicas.note_write()
+    if has_app_context():
+        g.db_written = True
+
+
+def get_db_connection(readonly=False):
+    """A connection for the caller; readonly=True lets it be a read replica.
+
+    Read-only callers get a replica unless this request has already
+    written or any write was made in the last DB_REPLICA_STICKY seconds,
+    so nobody reads back older data than they just wrote.
+    """
+    if DB_ENGINE == "sqlite":
+        return _get_sqlite_connection()
+    if readonly:
+        conn = _get_replica_connection()
+        if conn is not None:
+            return conn
+    if has_app_context():
+        if 'db_conn' not in g:
+            g.db_conn = get_pool().acquire()
+        return RequestConnection(g.db_conn)
+    return get_pool().acquire()
+
+
+def _get_replica_connection():
+    replicas = get_replicas()
+    if replicas is None or replicas.recently_written():
+        return None
+    if not has_app_context():
+        return replicas.acquire()
+    if g.get('db_written'):
+        return None
+    if 'db_read_conn' not in g:
+        conn = replicas.acquire()
+        if conn is None:
+            return None
+        g.db_read_conn = conn
+    return RequestConnection(g.db_read_conn)
+
+
+class InstrumentedSQLiteConnection:
+    """The thread's SQLite connection, with cursors instrumented like pooled ones."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._conn.cursor(*args, **kwargs)
+        return InstrumentedCursor(cursor) if DB_STATS else cursor
+
+
+def _get_sqlite_connection():
+    # SQLite connections are per thread and cheap to reuse, so there is no
+    # pool; close() rolls back whatever the caller left open
+    conn = InstrumentedSQLiteConnection(sqlite_engine.get_connection())
+    if has_app_context():
+        g.db_conn = conn
+        return RequestConnection(conn)
+    return conn
+
+
+def release_db_connection(exception=None):
+    for name in ('db_conn', 'db_read_conn'):
+        conn = g.pop(name, None)
+        if conn is not None:
+            conn.close()
+
+
+def init_app(app):
+    """Return each request's borrowed connections to their pools on teardown."""
+    app.teardown_appcontext(release_db_connection)
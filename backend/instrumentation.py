@@ -0,0 +1,328 @@
+"""Query and request instrumentation.
+
+Every cursor handed out by the connection pool is wrapped in
+InstrumentedCursor, which times each statement (execute plus the fetches
+that read its rows) and counts the rows. The numbers go to two places:
+
+* the RequestStats of the request being served (a context variable;
+  bind_request() lets the /dashboard worker threads report into the
+  request that started them), which is folded into the per-endpoint totals when it ends;
+* a latency histogram per statement fingerprint, i.e. the SQL with its
+  literals and whitespace normalized.
+
+Statements slower than SLOW_QUERY_MS are written to the slow-query log
+(stderr, or SLOW_QUERY_LOG if set). Everything is kept in fixed-size
+bucket histograms behind one lock, so it is cheap enough to leave on;
+DB_STATS=0 turns the bookkeeping off.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from dotenv import load_dotenv
+import logging
+import os
+import re
+import threading
+import time
+
+load_dotenv()
+
+DB_STATS = os.getenv("DB_STATS", "1") != "0"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG")
+MAX_STATEMENTS = int(os.getenv("STATS_MAX_STATEMENTS", "500"))
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+slow_query_log = logging.getLogger("slow_queries")
+slow_query_log.propagate = False
+slow_query_log.setLevel(logging.WARNING)
+slow_query_log.addHandler(
+    logging.FileHandler(SLOW_QUERY_LOG) if SLOW_QUERY_LOG else logging.StreamHandler()
+)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max), 3)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max, 3),
+        }
+
+
+class RequestStats:
+    """Totals for one request."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.rows = 0
+        self.connections = 0
+        self.acquire_wait_ms = 0.0
+        self.serialization_ms = 0.0
+        self.lock = threading.Lock()
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.rows = 0
+        self.connections = 0
+        self.acquire_wait_ms = 0.0
+        self.serialization_ms = 0.0
+        self.errors = 0
+
+    def summary(self):
+        requests = self.latency.count or 1
+        return {
+            'requests': self.latency.count,
+            'errors': self.errors,
+            'latency': self.latency.summary(),
+            'queries_per_request': round(self.queries / requests, 2),
+            'db_ms_per_request': round(self.db_ms / requests, 3),
+            'rows_per_request': round(self.rows / requests, 1),
+            'connections_per_request': round(self.connections / requests, 2),
+            'acquire_wait_ms_per_request': round(self.acquire_wait_ms / requests, 3),
+            'serialization_ms_per_request': round(self.serialization_ms / requests, 3),
+        }
+
+
+class StatementStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.rows = 0
+
+    def summary(self):
+        return dict(self.latency.summary(), rows=self.rows, total_ms=round(self.latency.total, 3))
+
+
+_current = ContextVar("request_stats", default=None)
+_lock = threading.Lock()
+_endpoints = {}
+_statements = {}
+_fingerprints = {}
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalize a statement so every call of the same query shares one key."""
+    key = _fingerprints.get(sql)
+    if key is None:
+        key = _STRING.sub("?", sql)
+        key = _NUMBER.sub("?", key)
+        key = _SPACE.sub(" ", key).strip()
+        key = _LIST.sub("(...)", key)
+        if len(_fingerprints) < MAX_STATEMENTS * 4:
+            _fingerprints[sql] = key
+    return key
+
+
+def start_request(endpoint):
+    if DB_STATS:
+        return _current.set(RequestStats(endpoint))
+
+
+def finish_request(token, error=False):
+    stats = _current.get()
+    if stats is None:
+        return
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Finished from another context (e.g. a streamed response)
+        _current.set(None)
+    elapsed_ms = (time.perf_counter() - stats.started) * 1000
+    with _lock:
+        endpoint = _endpoints.get(stats.endpoint)
+        if endpoint is None:
+            endpoint = _endpoints[stats.endpoint] = EndpointStats()
+        endpoint.latency.add(elapsed_ms)
+        endpoint.queries += stats.queries
+        endpoint.db_ms += stats.db_ms
+        endpoint.rows += stats.rows
+        endpoint.connections += stats.connections
+        endpoint.acquire_wait_ms += stats.acquire_wait_ms
+        endpoint.serialization_ms += stats.serialization_ms
+        if error:
+            endpoint.errors += 1
+
+
+def bind_request(func):
+    """Wrap func so that, run on another thread, it reports into this request's stats.
+
+    Only the stats are carried over, not the Flask app context, so the
+    worker borrows its own database connection instead of sharing the
+    request's.
+    """
+    stats = _current.get()
+
+    def run():
+        token = _current.set(stats)
+        try:
+            return func()
+        finally:
+            _current.reset(token)
+    return run
+
+
+def record_acquire(seconds):
+    stats = _current.get()
+    if stats is not None:
+        with stats.lock:
+            stats.connections += 1
+            stats.acquire_wait_ms += seconds * 1000
+
+
+def record_serialization(seconds):
+    stats = _current.get()
+    if stats is not None:
+        with stats.lock:
+            stats.serialization_ms += seconds * 1000
+
+
+def record_statement(sql, seconds, rows):
+    ms = seconds * 1000
+    key = fingerprint(sql)
+    stats = _current.get()
+    if stats is not None:
+        with stats.lock:
+            stats.queries += 1
+            stats.db_ms += ms
+            stats.rows += rows
+    with _lock:
+        statement = _statements.get(key)
+        if statement is None:
+            # Past the cap, new shapes share one bucket
+            bucket = key if len(_statements) < MAX_STATEMENTS else "(other)"
+            statement = _statements.get(bucket)
+            if statement is None:
+                statement = _statements[bucket] = StatementStats()
+        statement.latency.add(ms)
+        statement.rows += rows
+    if ms >= SLOW_QUERY_MS:
+        slow_query_log.warning(
+            "slow query %.1f ms rows=%d endpoint=%s: %s",
+            ms, rows, stats.endpoint if stats else "-", key
+        )
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times each statement and counts the rows it returns.
+
+    A statement is recorded when the next one starts or the cursor closes,
+    so the time spent fetching its rows is included.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._sql = None
+        self._seconds = 0.0
+        self._rows = 0
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._rows += 1
+            yield row
+
+    def _flush(self):
+        if self._sql is not None:
+            record_statement(self._sql, self._seconds, self._rows)
+            self._sql = None
+
+    def _timed(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._seconds += time.perf_counter() - started
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._flush()
+        self._sql, self._seconds, self._rows = operation, 0.0, 0
+        return self._timed(self._cursor.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._flush()
+        self._sql, self._seconds, self._rows = operation, 0.0, 0
+        return self._timed(self._cursor.executemany, operation, seq_params, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._timed(self._cursor.fetchmany, *args, **kwargs)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def close(self):
+        self._flush()
+        return self._cursor.close()
+
+
+def snapshot(top=50):
+    """Per-endpoint totals and the `top` statements by total time."""
+    with _lock:
+        endpoints = {name: stats.summary() for name, stats in sorted(_endpoints.items())}
+        statements = sorted(_statements.items(), key=lambda item: item[1].latency.total, reverse=True)
+        statements = [dict(stats.summary(), statement=key) for key, stats in statements[:top]]
+    return {
+        'enabled': DB_STATS,
+        'slow_query_ms': SLOW_QUERY_MS,
+        'buckets_ms': list(BUCKETS_MS),
+        'endpoints': endpoints,
+        'statements': statements,
+    }
+
+
+def reset():
+    with _lock:
+        _endpoints.clear()
+        _statements.clear()
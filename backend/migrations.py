@@ -0,0 +1,285 @@
+"""Ordered schema migrations.
+
+init_db() creates the base tables; everything after that is a migration.
+Each entry is (version, description, statements). Applied versions are
+recorded in Schema_Migrations, so every migration runs exactly once per
+database, in version order. Append new migrations to the end of the list
+and never edit one that has shipped.
+"""
+
+MIGRATIONS = [
+    (1, "Index appointments by date and time", [
+        "CREATE INDEX idx_appointments_date_time ON Appointments (appointment_date, appointment_time)",
+    ]),
+    (2, "Index appointments by status", [
+        "CREATE INDEX idx_appointments_status_date ON Appointments (status, appointment_date)",
+    ]),
+    (3, "Index customers by name", [
+        "CREATE INDEX idx_customers_name ON Customers (name)",
+    ]),
+    (4, "Index inventory stock levels", [
+        "CREATE INDEX idx_inventory_stock ON Inventory (quantity, reorder_level)",
+    ]),
+    (5, "Add daily rollups for appointments, package and inventory usage", [
+        '''
+        CREATE TABLE Appointment_Daily_Counts (
+            day DATE PRIMARY KEY,
+            appointments INT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE Package_Daily_Usage (
+            day DATE NOT NULL,
+            service_package_id INT NOT NULL,
+            appointments INT NOT NULL,
+            PRIMARY KEY (day, service_package_id),
+            FOREIGN KEY (service_package_id) REFERENCES Service_Packages(service_package_id)
+            ON DELETE CASCADE ON UPDATE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE Inventory_Daily_Usage (
+            day DATE NOT NULL,
+            inventory_id INT NOT NULL,
+            quantity_used INT NOT NULL,
+            PRIMARY KEY (day, inventory_id),
+            FOREIGN KEY (inventory_id) REFERENCES Inventory(inventory_id)
+            ON DELETE CASCADE ON UPDATE CASCADE
+        )
+        ''',
+        '''
+        INSERT INTO Appointment_Daily_Counts (day, appointments)
+        SELECT appointment_date, COUNT(*) FROM Appointments GROUP BY appointment_date
+        ''',
+        '''
+        INSERT INTO Package_Daily_Usage (day, service_package_id, appointments)
+        SELECT appointment_date, service_package_id, COUNT(*) FROM Appointments
+        WHERE service_package_id IS NOT NULL
+        GROUP BY appointment_date, service_package_id
+        ''',
+        '''
+        INSERT INTO Inventory_Daily_Usage (day, inventory_id, quantity_used)
+        SELECT Appointments.appointment_date, ServiceRecord_Inventory.inventory_id, SUM(ServiceRecord_Inventory.quantity_used)
+        FROM ServiceRecord_Inventory
+        JOIN Service_Records ON ServiceRecord_Inventory.service_record_id = Service_Records.service_record_id
+        JOIN Appointments ON Service_Records.appointment_id = Appointments.appointment_id
+        GROUP BY Appointments.appointment_date, ServiceRecord_Inventory.inventory_id
+        ''',
+    ]),
+    (6, "Add append-only inventory ledger", [
+        '''
+        CREATE TABLE Inventory_Ledger (
+            entry_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            inventory_id INT NOT NULL,
+            delta INT NOT NULL,
+            reason ENUM('consumption', 'restock', 'adjustment') NOT NULL,
+            service_record_id INT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            compacted BOOLEAN NOT NULL DEFAULT FALSE,
+            INDEX idx_ledger_pending (inventory_id, compacted),
+            INDEX idx_ledger_compaction (compacted, entry_id),
+            FOREIGN KEY (inventory_id) REFERENCES Inventory(inventory_id)
+            ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY (service_record_id) REFERENCES Service_Records(service_record_id)
+            ON DELETE SET NULL ON UPDATE CASCADE
+        )
+        ''',
+        # Current stock: the compacted snapshot in Inventory.quantity plus
+        # every ledger entry not yet folded into it
+        '''
+        CREATE VIEW Inventory_Current AS
+        SELECT
+            Inventory.inventory_id,
+            Inventory.product_name,
+            CAST(Inventory.quantity + COALESCE(SUM(Inventory_Ledger.delta), 0) AS SIGNED) AS quantity,
+            Inventory.reorder_level
+        FROM Inventory
+        LEFT JOIN Inventory_Ledger
+            ON Inventory_Ledger.inventory_id = Inventory.inventory_id AND Inventory_Ledger.compacted = FALSE
+        GROUP BY Inventory.inventory_id
+        ''',
+    ]),
+    # Email and license_plate are already indexed by their UNIQUE keys; the
+    # ngram parser indexes every 2-character token so substrings and
+    # misspellings can be matched, not just whole words
+    (7, "Add search indexes for customers and license plates", [
+        "CREATE INDEX idx_customers_phone ON Customers (phone)",
+        "CREATE FULLTEXT INDEX ft_customers_search ON Customers (name, email, phone) WITH PARSER ngram",
+        "CREATE FULLTEXT INDEX ft_vehicles_plate ON Vehicles (license_plate) WITH PARSER ngram",
+    ]),
+    # One row per table, bumped after every committed write; the GET
+    # routes derive their ETags from it
+    (8, "Add per-table change versions", [
+        '''
+        CREATE TABLE Table_Versions (
+            table_name VARCHAR(64) PRIMARY KEY,
+            version BIGINT NOT NULL
+        )
+        ''',
+    ]),
+    # Typed events for the /events change feed, written in the same
+    # transaction as the change they describe and pruned by change_feed.py
+    (9, "Add change feed events", [
+        '''
+        CREATE TABLE Change_Events (
+            event_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            event_type VARCHAR(64) NOT NULL,
+            payload TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    # Closed appointments older than ARCHIVE_AFTER_DAYS are moved here with
+    # their service records, items used and feedback, so the live tables
+    # only hold recent and upcoming work. No foreign keys: the archive
+    # outlives deleted packages and employees, and delete_customer() clears
+    # a customer's rows itself.
+    (10, "Add archive tables for closed appointments", [
+        '''
+        CREATE TABLE Appointments_Archive (
+            appointment_id INT PRIMARY KEY,
+            vehicle_id INT NOT NULL,
+            service_package_id INT NULL,
+            appointment_date DATE NOT NULL,
+            appointment_time TIME NOT NULL,
+            status ENUM('scheduled', 'completed', 'cancelled') NOT NULL,
+            archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_appointments_archive_date (appointment_date),
+            INDEX idx_appointments_archive_vehicle (vehicle_id)
+        )
+        ''',
+        '''
+        CREATE TABLE Service_Records_Archive (
+            service_record_id INT PRIMARY KEY,
+            appointment_id INT NOT NULL,
+            employee_id INT,
+            details TEXT,
+            duration INT,
+            INDEX idx_service_records_archive_appointment (appointment_id)
+        )
+        ''',
+        '''
+        CREATE TABLE ServiceRecord_Inventory_Archive (
+            service_record_id INT NOT NULL,
+            inventory_id INT NOT NULL,
+            quantity_used INT NOT NULL,
+            PRIMARY KEY (service_record_id, inventory_id)
+        )
+        ''',
+        '''
+        CREATE TABLE Feedback_Archive (
+            feedback_id INT PRIMARY KEY,
+            appointment_id INT NOT NULL,
+            customer_id INT NOT NULL,
+            rating INT,
+            comments TEXT,
+            INDEX idx_feedback_archive_appointment (appointment_id)
+        )
+        ''',
+    ]),
+    (11, "Count archived appointments in Row_Counts", [
+        "INSERT IGNORE INTO Row_Counts (table_name, row_count) "
+        "SELECT 'Appointments_Archive', COUNT(*) FROM Appointments_Archive",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# models/schema.sql creates the SQLite schema at this version. Newer
+# migrations whose MySQL statements SQLite cannot run need their SQLite
+# statements here, keyed by version.
+SQLITE_SCHEMA_VERSION = 7
+SQLITE_MIGRATIONS = {
+    9: [
+        '''
+        CREATE TABLE Change_Events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ],
+    10: [
+        '''
+        CREATE TABLE Appointments_Archive (
+            appointment_id INTEGER PRIMARY KEY,
+            vehicle_id INTEGER NOT NULL,
+            service_package_id INTEGER NULL,
+            appointment_date DATE NOT NULL,
+            appointment_time TIME NOT NULL,
+            status TEXT NOT NULL,
+            archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        "CREATE INDEX idx_appointments_archive_date ON Appointments_Archive (appointment_date)",
+        "CREATE INDEX idx_appointments_archive_vehicle ON Appointments_Archive (vehicle_id)",
+        '''
+        CREATE TABLE Service_Records_Archive (
+            service_record_id INTEGER PRIMARY KEY,
+            appointment_id INTEGER NOT NULL,
+            employee_id INTEGER,
+            details TEXT,
+            duration INTEGER
+        )
+        ''',
+        "CREATE INDEX idx_service_records_archive_appointment ON Service_Records_Archive (appointment_id)",
+        '''
+        CREATE TABLE ServiceRecord_Inventory_Archive (
+            service_record_id INTEGER NOT NULL,
+            inventory_id INTEGER NOT NULL,
+            quantity_used INTEGER NOT NULL,
+            PRIMARY KEY (service_record_id, inventory_id)
+        )
+        ''',
+        '''
+        CREATE TABLE Feedback_Archive (
+            feedback_id INTEGER PRIMARY KEY,
+            appointment_id INTEGER NOT NULL,
+            customer_id INTEGER NOT NULL,
+            rating INTEGER,
+            comments TEXT
+        )
+        ''',
+        "CREATE INDEX idx_feedback_archive_appointment ON Feedback_Archive (appointment_id)",
+    ],
+    11: [
+        "INSERT OR IGNORE INTO Row_Counts (table_name, row_count) "
+        "SELECT 'Appointments_Archive', COUNT(*) FROM Appointments_Archive",
+    ],
+}
+
+
+def get_schema_version(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Schema_Migrations (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM Schema_Migrations")
+    return cursor.fetchone()[0]
+
+
+def run_migrations(connection):
+    """Apply every migration newer than the recorded schema version."""
+    cursor = connection.cursor()
+    try:
+        current = get_schema_version(cursor)
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            # MySQL commits DDL implicitly, so each migration is recorded
+            # as soon as its statements have run
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO Schema_Migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+            connection.commit()
+            print(f"Applied migration {version}: {description}")
+        return max(current, LATEST_VERSION)
+    finally:
+        cursor.close()
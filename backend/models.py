@@ -1,5 +1,297 @@
-from database import get_db_connection
+from availability import BAY_COUNT, DEFAULT_DURATION, availability
+from cache import cached, invalidate, on_invalidate, query_cache
+from change_feed import change_feed
+from database import DB_ENGINE, get_db_connection, note_write
 from datetime import date, timedelta
+from mysql.connector import errorcode
+from serialization import Rows, json_default
+from time import sleep
+import base64
+import json
+import mysql.connector
+import random
+import threading
+
+# Batched loaders: resolve related rows for a whole list with one IN (...)
+# query per relation instead of one lookup per row.
+LOADER_BATCH_SIZE = 1000
+
+def _load_by_ids(table, key, ids, columns="*"):
+    ids = sorted({i for i in ids if i is not None})
+    if not ids:
+        return {}
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        rows = {}
+        for start in range(0, len(ids), LOADER_BATCH_SIZE):
+            chunk = ids[start:start + LOADER_BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"SELECT {columns} FROM {table} WHERE {key} IN ({placeholders})", tuple(chunk))
+            for row in cursor.fetchall():
+                rows[row[key]] = row
+        return rows
+    finally:
+        cursor.close()
+        conn.close()
+
+def load_customers(customer_ids):
+    return _load_by_ids("Customers", "customer_id", customer_ids)
+
+def load_vehicles(vehicle_ids):
+    return _load_by_ids("Vehicles", "vehicle_id", vehicle_ids)
+
+def load_service_packages(package_ids):
+    return _load_by_ids("Service_Packages", "service_package_id", package_ids)
+
+def load_employees(employee_ids):
+    return _load_by_ids("Employees", "employee_id", employee_ids)
+
+def attach_related(rows, key, related, fields):
+    """Copy `fields` ({source_column: target_name}) from the related row matching row[key]."""
+    for row in rows:
+        match = related.get(row[key])
+        for source, target in fields.items():
+            row[target] = match[source] if match else None
+    return rows
+
+# Keyset pagination: list functions take limit/after/sort/order, and the
+# `after` cursor carries the sort value and id of the last row already seen,
+# so each page is an index range scan instead of an OFFSET.
+MAX_PAGE_SIZE = 500
+
+class InvalidQueryError(ValueError):
+    """Raised for bad pagination, sort or filter arguments."""
+
+def encode_cursor(sort, values):
+    payload = json.dumps({"sort": sort, "values": values}, default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(token, sort):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["values"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidQueryError("Invalid cursor")
+    if payload.get("sort") != sort:
+        raise InvalidQueryError("Cursor was issued for a different sort order")
+    return values
+
+def next_cursor(rows, limit, sort, id_column):
+    """Cursor for the page after `rows`, or None when this was the last page."""
+    if limit is None or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if sort == id_column:
+        return encode_cursor(sort, [last[id_column]])
+    return encode_cursor(sort, [last[sort], last[id_column]])
+
+def _paged_select(cursor, select_sql, conditions, params, sort_columns, id_column,
+                  sort=None, order="asc", after=None, limit=None):
+    sort = sort or id_column
+    if sort not in sort_columns:
+        raise InvalidQueryError(f"Cannot sort by '{sort}'")
+    if order not in ("asc", "desc"):
+        raise InvalidQueryError("order must be 'asc' or 'desc'")
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise InvalidQueryError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    sort_sql = sort_columns[sort]
+    id_sql = sort_columns[id_column]
+    conditions = list(conditions)
+    params = list(params)
+    if after:
+        values = decode_cursor(after, sort)
+        op = ">" if order == "asc" else "<"
+        if sort == id_column:
+            conditions.append(f"{id_sql} {op} %s")
+            params.append(values[0])
+        else:
+            conditions.append(f"({sort_sql} {op} %s OR ({sort_sql} = %s AND {id_sql} {op} %s))")
+            params.extend([values[0], values[0], values[1]])
+
+    sql = select_sql
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {sort_sql} {order.upper()}"
+    if sort != id_column:
+        sql += f", {id_sql} {order.upper()}"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    cursor.execute(sql, tuple(params))
+    return cursor.fetchall()
+
+# Sortable columns per list; only NOT NULL columns, so keyset comparisons hold
+CUSTOMER_SORTS = {"customer_id": "customer_id", "name": "name", "email": "email"}
+VEHICLE_SORTS = {"vehicle_id": "vehicle_id", "license_plate": "license_plate"}
+APPOINTMENT_SORTS = {
+    "appointment_id": "Appointments.appointment_id",
+    "appointment_date": "Appointments.appointment_date",
+}
+INVENTORY_SORTS = {"inventory_id": "inventory_id", "product_name": "product_name", "quantity": "quantity"}
+EMPLOYEE_SORTS = {"employee_id": "employee_id", "name": "name"}
+
+# Sparse fieldsets: list functions take `fields`, checked against these
+# columns and pushed down into the SELECT list. The id and sort columns
+# are always selected, since the next page's cursor is built from them.
+CUSTOMER_FIELDS = ("customer_id", "name", "email", "phone", "address")
+VEHICLE_FIELDS = ("vehicle_id", "customer_id", "model_year", "license_plate")
+INVENTORY_FIELDS = ("inventory_id", "product_name", "quantity", "reorder_level")
+EMPLOYEE_FIELDS = ("employee_id", "name", "email", "phone", "is_active")
+
+def _columns(fields, allowed, *required):
+    """SELECT list for `fields`, in table order so each field set is one prepared statement."""
+    if fields is None:
+        return "*"
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise InvalidQueryError(
+            f"Unknown fields: {', '.join(sorted(unknown))}; choose from {', '.join(allowed)}"
+        )
+    wanted = set(fields).union(required)
+    return ", ".join(column for column in allowed if column in wanted)
+
+def get_row_counts():
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True)
+    try:
+        cursor.execute("SELECT table_name, row_count FROM Row_Counts")
+        return {table: count for table, count in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+# Change feed events: inserted inside the writer's transaction so an event
+# is published exactly when its change commits; change_feed.py streams them
+# to the /events subscribers
+def _publish(cursor, event_type, **payload):
+    cursor.execute(
+        "INSERT INTO Change_Events (event_type, payload) VALUES (%s, %s)",
+        (event_type, json.dumps(payload, default=json_default)),
+    )
+
+# Per-table change versions for the ETags on GET routes. Every writer
+# calls invalidate() once its transaction has committed, so the versions
+# are bumped from there, in one statement shared by all workers, along
+# with a tables.changed event for the change feed.
+@on_invalidate
+def bump_table_versions(tables):
+    tables = sorted(set(tables))
+    if not tables:
+        return
+    try:
+        _retrying(_bump_table_versions, tables)
+    except Exception as e:
+        # The write itself has already committed, so its caller must not
+        # see this as a failure; other workers' ETags and caches for these
+        # tables lag until the next bump or CACHE_TTL
+        print(f"Could not bump table versions for {', '.join(tables)}: {e}")
+        return
+    change_feed.wake()
+
+def _bump_table_versions(tables):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO Table_Versions (table_name, version) VALUES "
+            + ", ".join(["(%s, 1)"] * len(tables))
+            + " ON DUPLICATE KEY UPDATE version = version + 1",
+            tuple(tables)
+        )
+        _publish(cursor, "tables.changed", tables=tables)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+# After a write, reads stay on the primary until the replicas can have caught up
+on_invalidate(lambda tables: note_write())
+
+def get_table_versions(tables):
+    """Current version of each table, in order; 0 for tables never written.
+
+    Cached results for tables another worker has written since are dropped,
+    so a response tagged with these versions is not built from them.
+    """
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True)
+    try:
+        cursor.execute("SELECT table_name, version FROM Table_Versions")
+        versions = dict(cursor.fetchall())
+        query_cache.sync(versions)
+        return [versions.get(table, 0) for table in tables]
+    finally:
+        cursor.close()
+        conn.close()
+
+# Row_Counts and the daily rollups (per-day appointment totals and
+# per-package / per-item usage), so /metrics and analytics read one row per
+# total or bucket instead of scanning. Writers bump them after their own
+# commit, in a short transaction of their own, so these hot rows (one per
+# table, one per day) are only locked for a moment rather than for the whole
+# write. Every writer goes through _bump_counters(), which locks them in one
+# order: Appointment_Daily_Counts, Package_Daily_Usage,
+# Inventory_Daily_Usage, then Row_Counts, each by key. A bump that still
+# fails after retries is logged; benchmarks.seed rebuilds them from the
+# tables.
+def _bump_counters(counts=None, appointments=(), inventory=()):
+    """Apply {table: delta} to Row_Counts and [(day, package_id, delta)] /
+    [(day, inventory_id, quantity)] to the rollups."""
+    days, packages, items = {}, {}, {}
+    for day, package_id, delta in appointments:
+        days[str(day)] = days.get(str(day), 0) + delta
+        if package_id is not None:
+            packages[str(day), package_id] = packages.get((str(day), package_id), 0) + delta
+    for day, inventory_id, quantity in inventory:
+        items[str(day), inventory_id] = items.get((str(day), inventory_id), 0) + int(quantity)
+    counts = {table: delta for table, delta in (counts or {}).items() if delta}
+    if not (days or packages or items or counts):
+        return
+
+    def bump():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            for day in sorted(days):
+                cursor.execute("""
+                    INSERT INTO Appointment_Daily_Counts (day, appointments) VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE appointments = appointments + %s
+                """, (day, days[day], days[day]))
+            for day, package_id in sorted(packages):
+                delta = packages[day, package_id]
+                cursor.execute("""
+                    INSERT INTO Package_Daily_Usage (day, service_package_id, appointments) VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE appointments = appointments + %s
+                """, (day, package_id, delta, delta))
+            for day, inventory_id in sorted(items):
+                quantity = items[day, inventory_id]
+                cursor.execute("""
+                    INSERT INTO Inventory_Daily_Usage (day, inventory_id, quantity_used) VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE quantity_used = quantity_used + %s
+                """, (day, inventory_id, quantity, quantity))
+            for table in sorted(counts):
+                cursor.execute(
+                    "UPDATE Row_Counts SET row_count = row_count + %s WHERE table_name = %s",
+                    (counts[table], table),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    try:
+        _retrying(bump)
+    except Exception as e:
+        print(f"Could not update row counts and rollups: {e}")
 
 # Customer-related operations
 def add_customer(name, email, phone, address):
@@ -11,6 +303,8 @@ def add_customer(name, email, phone, address):
             (name, email, phone, address),
         )
         conn.commit()
+        _bump_counters({"Customers": 1})
+        invalidate("Customers")
     finally:
         cursor.close()
         conn.close()
@@ -24,6 +318,7 @@ def update_customer(customer_id, name, email, phone, address):
             (name, email, phone, address, customer_id),
         )
         conn.commit()
+        invalidate("Customers")
     finally:
         cursor.close()
         conn.close()
@@ -32,8 +327,72 @@ def delete_customer(customer_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
+        # Vehicles and their appointments go with the customer (ON DELETE CASCADE)
+        cursor.execute(
+            "SELECT COUNT(*) FROM Vehicles WHERE customer_id = %s FOR UPDATE", (customer_id,)
+        )
+        vehicle_count = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT Appointments.appointment_date, Appointments.service_package_id, COUNT(*)
+            FROM Appointments
+            JOIN Vehicles ON Appointments.vehicle_id = Vehicles.vehicle_id
+            WHERE Vehicles.customer_id = %s
+            GROUP BY Appointments.appointment_date, Appointments.service_package_id
+            FOR UPDATE
+        """, (customer_id,))
+        appointment_groups = cursor.fetchall()
+        cursor.execute("""
+            SELECT Appointments.appointment_date, ServiceRecord_Inventory.inventory_id,
+                   SUM(ServiceRecord_Inventory.quantity_used)
+            FROM ServiceRecord_Inventory
+            JOIN Service_Records ON ServiceRecord_Inventory.service_record_id = Service_Records.service_record_id
+            JOIN Appointments ON Service_Records.appointment_id = Appointments.appointment_id
+            JOIN Vehicles ON Appointments.vehicle_id = Vehicles.vehicle_id
+            WHERE Vehicles.customer_id = %s
+            GROUP BY Appointments.appointment_date, ServiceRecord_Inventory.inventory_id
+        """, (customer_id,))
+        inventory_groups = cursor.fetchall()
+        # Their archived history goes too; the archive tables have no
+        # foreign keys to cascade from, so it is deleted here
+        cursor.execute("""
+            SELECT Appointments_Archive.appointment_date, Appointments_Archive.service_package_id, COUNT(*)
+            FROM Appointments_Archive
+            JOIN Vehicles ON Appointments_Archive.vehicle_id = Vehicles.vehicle_id
+            WHERE Vehicles.customer_id = %s
+            GROUP BY Appointments_Archive.appointment_date, Appointments_Archive.service_package_id
+        """, (customer_id,))
+        archived_groups = cursor.fetchall()
+        cursor.execute("""
+            SELECT Appointments_Archive.appointment_date, ServiceRecord_Inventory_Archive.inventory_id,
+                   SUM(ServiceRecord_Inventory_Archive.quantity_used)
+            FROM ServiceRecord_Inventory_Archive
+            JOIN Service_Records_Archive
+                ON ServiceRecord_Inventory_Archive.service_record_id = Service_Records_Archive.service_record_id
+            JOIN Appointments_Archive ON Service_Records_Archive.appointment_id = Appointments_Archive.appointment_id
+            JOIN Vehicles ON Appointments_Archive.vehicle_id = Vehicles.vehicle_id
+            WHERE Vehicles.customer_id = %s
+            GROUP BY Appointments_Archive.appointment_date, ServiceRecord_Inventory_Archive.inventory_id
+        """, (customer_id,))
+        archived_inventory_groups = cursor.fetchall()
+        _delete_archived_history(cursor, customer_id)
         cursor.execute("DELETE FROM Customers WHERE customer_id = %s", (customer_id,))
+        deleted = cursor.rowcount
         conn.commit()
+        if deleted:
+            _bump_counters(
+                {
+                    "Customers": -1,
+                    "Vehicles": -vehicle_count,
+                    "Appointments": -sum(count for _, _, count in appointment_groups),
+                    "Appointments_Archive": -sum(count for _, _, count in archived_groups),
+                },
+                [(day, package_id, -count) for day, package_id, count in appointment_groups + archived_groups],
+                [(day, inventory_id, -int(quantity))
+                 for day, inventory_id, quantity in inventory_groups + archived_inventory_groups],
+            )
+        invalidate("Customers", "Vehicles", "Appointments", "Service_Records", "ServiceRecord_Inventory", "Feedback",
+                   "Appointments_Archive")
+        availability.forget()
     finally:
         cursor.close()
         conn.close()
@@ -49,18 +408,124 @@ def get_customer_id_from_name(name):
         cursor.close()
         conn.close()
 
-def get_customers(customer_id=None):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+def get_customers(customer_id=None, limit=None, after=None, sort=None, order="asc", fields=None):
+    columns = _columns(fields, CUSTOMER_FIELDS, "customer_id", sort or "customer_id")
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True, dictionary=bool(customer_id))
     try:
         if customer_id:
-            cursor.execute("SELECT * FROM Customers WHERE customer_id = %s", (customer_id,))
+            cursor.execute(f"SELECT {columns} FROM Customers WHERE customer_id = %s", (customer_id,))
             customer = cursor.fetchone()
             return customer
         else:
-            cursor.execute("SELECT * FROM Customers")
-            customers = cursor.fetchall()
-            return customers
+            customers = _paged_select(
+                cursor, f"SELECT {columns} FROM Customers", [], [], CUSTOMER_SORTS, "customer_id",
+                sort, order, after, limit
+            )
+            return Rows.from_cursor(cursor, customers)
+    finally:
+        cursor.close()
+        conn.close()
+
+# Typeahead search over customer name, email, phone and license plate.
+# Prefix matches come from the B-tree indexes; when they do not fill the
+# page, the ngram full-text indexes add substring matches and then, for
+# misspellings, rows sharing the most 2-character tokens with the query.
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+SEARCH_KINDS = ("customer", "vehicle")
+FULLTEXT_SPECIAL = str.maketrans("", "", '"+-<>()~*@')
+
+SEARCH_SELECTS = {
+    "customer": """
+        SELECT 'customer' AS type, customer_id AS id, customer_id, name, email, phone, address,
+               NULL AS license_plate
+        FROM Customers
+    """,
+    "vehicle": """
+        SELECT 'vehicle' AS type, Vehicles.vehicle_id AS id, Customers.customer_id, Customers.name,
+               Customers.email, Customers.phone, Customers.address, Vehicles.license_plate
+        FROM Vehicles
+        JOIN Customers ON Vehicles.customer_id = Customers.customer_id
+    """,
+}
+SEARCH_PREFIX_COLUMNS = {
+    "customer": ("name", "email", "phone"),
+    "vehicle": ("Vehicles.license_plate",),
+}
+SEARCH_FULLTEXT_COLUMNS = {
+    "customer": "name, email, phone",
+    "vehicle": "Vehicles.license_plate",
+}
+
+# Not cached: typeahead adds an entry per distinct prefix, which would push
+# the dashboard aggregates out of the cache. Repeated searches are answered
+# by the route's ETag instead.
+def search(q, limit=SEARCH_LIMIT, kinds=SEARCH_KINDS):
+    q = q.strip()
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        raise InvalidQueryError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+    for kind in kinds:
+        if kind not in SEARCH_KINDS:
+            raise InvalidQueryError(f"Cannot search '{kind}'")
+    if not q:
+        return []
+
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True)
+    try:
+        results, seen = [], set()
+
+        def collect(parts, params):
+            # Each part is wrapped in a derived table so its ORDER BY and
+            # LIMIT apply to it alone, in MySQL and SQLite alike
+            query = " UNION ALL ".join(f"SELECT * FROM ({part}) AS part{i}" for i, part in enumerate(parts))
+            cursor.execute(query, tuple(params))
+            for row in cursor.fetchall():
+                if len(results) < limit and (row[0], row[1]) not in seen:
+                    seen.add((row[0], row[1]))
+                    results.append(row)
+
+        escaped = q.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+        parts, params = [], []
+        for kind in kinds:
+            for column in SEARCH_PREFIX_COLUMNS[kind]:
+                parts.append(f"{SEARCH_SELECTS[kind]} WHERE {column} LIKE %s ESCAPE '!' ORDER BY {column} LIMIT %s")
+                params.extend([escaped + "%", limit])
+        collect(parts, params)
+
+        if DB_ENGINE == "sqlite":
+            # No full-text indexes in SQLite: fall back to a substring scan
+            if len(results) < limit and len(q) >= 2:
+                parts, params = [], []
+                for kind in kinds:
+                    columns = SEARCH_PREFIX_COLUMNS[kind]
+                    where = " OR ".join(f"{column} LIKE %s ESCAPE '!'" for column in columns)
+                    parts.append(f"{SEARCH_SELECTS[kind]} WHERE {where} LIMIT %s")
+                    params.extend([f"%{escaped}%"] * len(columns) + [limit])
+                collect(parts, params)
+            return Rows.from_cursor(cursor, results)
+
+        terms = q.translate(FULLTEXT_SPECIAL).strip()
+        if len(results) < limit and len(terms) >= 2:
+            # Substrings: the query's tokens as one phrase
+            parts, params = [], []
+            for kind in kinds:
+                match = f"MATCH({SEARCH_FULLTEXT_COLUMNS[kind]})"
+                parts.append(f"{SEARCH_SELECTS[kind]} WHERE {match} AGAINST (%s IN BOOLEAN MODE) LIMIT %s")
+                params.extend([f'"{terms}"', limit])
+            collect(parts, params)
+
+        if len(results) < limit and len(terms) >= 3:
+            # Misspellings: ranked by how many of the query's tokens match
+            parts, params = [], []
+            for kind in kinds:
+                match = f"MATCH({SEARCH_FULLTEXT_COLUMNS[kind]}) AGAINST (%s)"
+                parts.append(f"{SEARCH_SELECTS[kind]} WHERE {match} ORDER BY {match} DESC LIMIT %s")
+                params.extend([terms, terms, limit])
+            collect(parts, params)
+
+        return Rows.from_cursor(cursor, results)
     finally:
         cursor.close()
         conn.close()
@@ -74,28 +539,46 @@ def add_vehicle(customer_id, model_year, license_plate):
             "INSERT INTO Vehicles (customer_id, model_year, license_plate) VALUES (%s, %s, %s)",
             (customer_id, model_year, license_plate),
         )
+        vehicle_id = cursor.lastrowid
         conn.commit()
-        return cursor.lastrowid
+        _bump_counters({"Vehicles": 1})
+        invalidate("Vehicles")
+        return vehicle_id
     finally:
         cursor.close()
         conn.close()
 
-def get_vehicles_by_customer(customer_id=None):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+def get_vehicles_by_customer(customer_id=None, limit=None, after=None, sort=None, order="asc", fields=None):
+    columns = _columns(fields, VEHICLE_FIELDS, "vehicle_id", sort or "vehicle_id")
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True, dictionary=True)
     try:
-        if customer_id is None:
-            cursor.execute("SELECT * FROM Vehicles")
-        else:
-            cursor.execute("SELECT * FROM Vehicles WHERE customer_id = %s", (customer_id,))
-        vehicles = cursor.fetchall()
+        conditions, params = [], []
+        if customer_id is not None:
+            conditions.append("customer_id = %s")
+            params.append(customer_id)
+        vehicles = _paged_select(
+            cursor, f"SELECT {columns} FROM Vehicles", conditions, params, VEHICLE_SORTS, "vehicle_id",
+            sort, order, after, limit
+        )
         return vehicles
     finally:
         cursor.close()
         conn.close()
         
+def get_vehicles_with_customers(customer_id=None, fields=None, **page):
+    """Vehicles with their owner's name; `fields` may also name customer_name."""
+    with_names = fields is None or 'customer_name' in fields
+    if fields is not None:
+        fields = [field for field in fields if field != 'customer_name'] + (['customer_id'] if with_names else [])
+    vehicles = get_vehicles_by_customer(customer_id, fields=fields, **page)
+    if not with_names:
+        return vehicles
+    customers = load_customers(vehicle['customer_id'] for vehicle in vehicles)
+    return attach_related(vehicles, 'customer_id', customers, {'name': 'customer_name'})
+
 def get_vehicle(vehicle_id):
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor(dictionary=True)
     try:
         cursor.execute("SELECT * FROM Vehicles WHERE vehicle_id = %s", (vehicle_id,))
@@ -115,13 +598,14 @@ def add_service_package(name, description, price, duration):
             (name, description, price, duration),
         )
         conn.commit()
+        invalidate("Service_Packages")
     finally:
         cursor.close()
         conn.close()
 
 def get_service_packages():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True, dictionary=True)
     try:
         cursor.execute("SELECT * FROM Service_Packages")
         packages = cursor.fetchall()
@@ -139,17 +623,67 @@ def add_appointment(vehicle_id, service_package_id, date, time, status="schedule
             "INSERT INTO Appointments (vehicle_id, service_package_id, appointment_date, appointment_time, status) VALUES (%s, %s, %s, %s, %s)",
             (vehicle_id, service_package_id, date, time, status),
         )
+        appointment_id = cursor.lastrowid
+        _publish(cursor, "appointment.scheduled", appointment_id=appointment_id, vehicle_id=vehicle_id,
+                 service_package_id=service_package_id, date=date, time=time, status=status)
         conn.commit()
+        _bump_counters({"Appointments": 1}, [(date, service_package_id, 1)])
+        invalidate("Appointments")
+        availability.forget(date)
     finally:
         cursor.close()
         conn.close()
 
-def get_appointments():
+APPOINTMENT_STATUSES = ('scheduled', 'completed', 'cancelled')
+
+def update_appointment_status(appointment_id, status):
+    """Set the appointment's status; False if there is no such appointment."""
+    if status not in APPOINTMENT_STATUSES:
+        raise InvalidQueryError(f"status must be one of {', '.join(APPOINTMENT_STATUSES)}")
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT appointment_date, status FROM Appointments WHERE appointment_id = %s FOR UPDATE",
+            (appointment_id,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            conn.rollback()
+            return False
+        day, previous = row
+        if previous == status:
+            conn.rollback()
+            return True
+        cursor.execute("UPDATE Appointments SET status = %s WHERE appointment_id = %s", (status, appointment_id))
+        _publish(cursor, "appointment.status_changed", appointment_id=appointment_id, date=day,
+                 previous=previous, status=status)
+        conn.commit()
+        invalidate("Appointments")
+        # A cancellation frees the slot
+        availability.forget(day)
+        return True
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_appointments(status=None, date_from=None, date_to=None,
+                     limit=None, after=None, sort=None, order="asc"):
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True)
 
     try:
-        cursor.execute("""
+        conditions, params = [], []
+        if status is not None:
+            conditions.append("Appointments.status = %s")
+            params.append(status)
+        if date_from is not None:
+            conditions.append("Appointments.appointment_date >= %s")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("Appointments.appointment_date <= %s")
+            params.append(date_to)
+        appointments = _paged_select(cursor, """
             SELECT
                 Appointments.appointment_id,
                 Appointments.vehicle_id,
@@ -163,25 +697,8 @@ def get_appointments():
                 Appointments
             JOIN Vehicles ON Appointments.vehicle_id = Vehicles.vehicle_id
             JOIN Service_Packages ON Appointments.service_package_id = Service_Packages.service_package_id
-        """)
-        appointments = cursor.fetchall()
-
-         # Convert non-serializable fields to strings
-        for appointment in appointments:
-            # Convert `appointment_date` to string
-            if isinstance(appointment['appointment_date'], date):
-                appointment['appointment_date'] = appointment['appointment_date'].strftime('%Y-%m-%d')
-
-            # Convert `appointment_time` to string (timedelta to HH:MM format)
-            if isinstance(appointment['appointment_time'], timedelta):
-                total_seconds = appointment['appointment_time'].total_seconds()
-                hours = int(total_seconds // 3600)
-                minutes = int((total_seconds % 3600) // 60)
-                appointment['appointment_time'] = f"{hours:02d}:{minutes:02d}"
-
-        print(appointments)
-        return appointments
-    
+        """, conditions, params, APPOINTMENT_SORTS, "appointment_id", sort, order, after, limit)
+        return Rows.from_cursor(cursor, appointments)
     finally:
         cursor.close()
         conn.close()
@@ -209,6 +726,270 @@ def get_appointments():
 #         cursor.close()
 #         conn.close()
 
+# Service record-related operations
+def get_service_records(appointment_id=None):
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if appointment_id is None:
+            cursor.execute("SELECT * FROM Service_Records")
+        else:
+            cursor.execute("SELECT * FROM Service_Records WHERE appointment_id = %s", (appointment_id,))
+        records = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    employees = load_employees(record['employee_id'] for record in records)
+    return attach_related(records, 'employee_id', employees, {'name': 'employee_name'})
+
+# Archival: completed and cancelled appointments older than a cutoff are
+# moved, with their service records, items used and feedback, into the
+# *_Archive tables in bounded batches, so queries on the live tables only
+# scan recent and upcoming work. The daily rollups keep counting archived
+# appointments, so analytics do not change, and Row_Counts tracks them under
+# Appointments_Archive so the appointment total does not drop either.
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_SORTS = {
+    "appointment_id": "Appointments_Archive.appointment_id",
+    "appointment_date": "Appointments_Archive.appointment_date",
+}
+
+def archive_appointments(older_than_days, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive one batch of closed appointments dated more than `older_than_days` ago.
+
+    Returns the number of appointments moved.
+    """
+    cutoff = date.today() - timedelta(days=older_than_days)
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Skip rows a status update holds, rather than wait for them
+        cursor.execute("""
+            SELECT appointment_id FROM Appointments
+            WHERE status IN ('completed', 'cancelled') AND appointment_date < %s
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (cutoff, batch_size))
+        appointment_ids = [row[0] for row in cursor.fetchall()]
+        if not appointment_ids:
+            conn.rollback()
+            return 0
+        placeholders = ", ".join(["%s"] * len(appointment_ids))
+        params = tuple(appointment_ids)
+        cursor.execute(f"""
+            INSERT INTO ServiceRecord_Inventory_Archive (service_record_id, inventory_id, quantity_used)
+            SELECT ServiceRecord_Inventory.service_record_id, ServiceRecord_Inventory.inventory_id,
+                   ServiceRecord_Inventory.quantity_used
+            FROM ServiceRecord_Inventory
+            JOIN Service_Records ON ServiceRecord_Inventory.service_record_id = Service_Records.service_record_id
+            WHERE Service_Records.appointment_id IN ({placeholders})
+        """, params)
+        cursor.execute(f"""
+            INSERT INTO Service_Records_Archive (service_record_id, appointment_id, employee_id, details, duration)
+            SELECT service_record_id, appointment_id, employee_id, details, duration
+            FROM Service_Records WHERE appointment_id IN ({placeholders})
+        """, params)
+        cursor.execute(f"""
+            INSERT INTO Feedback_Archive (feedback_id, appointment_id, customer_id, rating, comments)
+            SELECT feedback_id, appointment_id, customer_id, rating, comments
+            FROM Feedback WHERE appointment_id IN ({placeholders})
+        """, params)
+        cursor.execute(f"""
+            INSERT INTO Appointments_Archive
+                (appointment_id, vehicle_id, service_package_id, appointment_date, appointment_time, status)
+            SELECT appointment_id, vehicle_id, service_package_id, appointment_date, appointment_time, status
+            FROM Appointments WHERE appointment_id IN ({placeholders})
+        """, params)
+        # The live service records, items used and feedback go by ON DELETE
+        # CASCADE; ledger entries keep their stock movement but their
+        # service_record_id is set to NULL
+        cursor.execute(f"DELETE FROM Appointments WHERE appointment_id IN ({placeholders})", params)
+        conn.commit()
+        _bump_counters({"Appointments": -len(appointment_ids), "Appointments_Archive": len(appointment_ids)})
+        invalidate("Appointments", "Service_Records", "ServiceRecord_Inventory", "Feedback", "Appointments_Archive")
+        return len(appointment_ids)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+_archiver_started = False
+_archiver_lock = threading.Lock()
+
+def start_appointment_archiver(interval, older_than_days):
+    """Run archive_appointments() every `interval` seconds on a daemon thread."""
+    global _archiver_started
+    with _archiver_lock:
+        if _archiver_started or interval <= 0:
+            return
+        _archiver_started = True
+
+    def run():
+        while True:
+            sleep(interval)
+            try:
+                while archive_appointments(older_than_days) == ARCHIVE_BATCH_SIZE:
+                    pass
+            except Exception as e:
+                print(f"Appointment archival failed: {e}")
+
+    threading.Thread(target=run, name="appointment-archiver", daemon=True).start()
+
+def _delete_archived_history(cursor, customer_id):
+    # The ids are read first: MySQL cannot delete from a table that the
+    # statement's own subquery reads (error 1093)
+    cursor.execute("""
+        SELECT Appointments_Archive.appointment_id FROM Appointments_Archive
+        JOIN Vehicles ON Appointments_Archive.vehicle_id = Vehicles.vehicle_id
+        WHERE Vehicles.customer_id = %s
+    """, (customer_id,))
+    appointment_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("DELETE FROM Feedback_Archive WHERE customer_id = %s", (customer_id,))
+    if not appointment_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(appointment_ids))
+    cursor.execute(
+        f"SELECT service_record_id FROM Service_Records_Archive WHERE appointment_id IN ({placeholders})",
+        tuple(appointment_ids)
+    )
+    service_record_ids = [row[0] for row in cursor.fetchall()]
+    if service_record_ids:
+        cursor.execute(f"""
+            DELETE FROM ServiceRecord_Inventory_Archive
+            WHERE service_record_id IN ({", ".join(["%s"] * len(service_record_ids))})
+        """, tuple(service_record_ids))
+    cursor.execute(
+        f"DELETE FROM Service_Records_Archive WHERE appointment_id IN ({placeholders})", tuple(appointment_ids)
+    )
+    cursor.execute(f"DELETE FROM Feedback_Archive WHERE appointment_id IN ({placeholders})", tuple(appointment_ids))
+    cursor.execute(f"DELETE FROM Appointments_Archive WHERE appointment_id IN ({placeholders})", tuple(appointment_ids))
+
+def get_archived_appointments(vehicle_id=None, customer_id=None, status=None, date_from=None, date_to=None,
+                              limit=None, after=None, sort=None, order="asc"):
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True)
+    try:
+        conditions, params = [], []
+        if vehicle_id is not None:
+            conditions.append("Appointments_Archive.vehicle_id = %s")
+            params.append(vehicle_id)
+        if customer_id is not None:
+            conditions.append("Vehicles.customer_id = %s")
+            params.append(customer_id)
+        if status is not None:
+            conditions.append("Appointments_Archive.status = %s")
+            params.append(status)
+        if date_from is not None:
+            conditions.append("Appointments_Archive.appointment_date >= %s")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("Appointments_Archive.appointment_date <= %s")
+            params.append(date_to)
+        # Packages may have been deleted since; the archive keeps their id
+        appointments = _paged_select(cursor, """
+            SELECT
+                Appointments_Archive.appointment_id,
+                Appointments_Archive.vehicle_id,
+                Appointments_Archive.service_package_id,
+                Appointments_Archive.appointment_date,
+                Appointments_Archive.appointment_time,
+                Appointments_Archive.status,
+                Vehicles.license_plate,
+                Service_Packages.package_name
+            FROM
+                Appointments_Archive
+            JOIN Vehicles ON Appointments_Archive.vehicle_id = Vehicles.vehicle_id
+            LEFT JOIN Service_Packages ON Appointments_Archive.service_package_id = Service_Packages.service_package_id
+        """, conditions, params, ARCHIVE_SORTS, "appointment_id", sort, order, after, limit)
+        return Rows.from_cursor(cursor, appointments)
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_archived_appointment(appointment_id):
+    """The archived appointment with its service records, items used and feedback; None if not archived."""
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT * FROM Appointments_Archive WHERE appointment_id = %s", (appointment_id,))
+        appointment = cursor.fetchone()
+        if appointment is None:
+            return None
+        cursor.execute(
+            "SELECT * FROM Service_Records_Archive WHERE appointment_id = %s ORDER BY service_record_id",
+            (appointment_id,)
+        )
+        records = cursor.fetchall()
+        items = []
+        if records:
+            placeholders = ", ".join(["%s"] * len(records))
+            cursor.execute(
+                f"SELECT * FROM ServiceRecord_Inventory_Archive WHERE service_record_id IN ({placeholders})",
+                tuple(record['service_record_id'] for record in records)
+            )
+            items = cursor.fetchall()
+        cursor.execute("SELECT * FROM Feedback_Archive WHERE appointment_id = %s", (appointment_id,))
+        appointment['feedback'] = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    products = _load_by_ids("Inventory", "inventory_id", (item['inventory_id'] for item in items),
+                            "inventory_id, product_name")
+    attach_related(items, 'inventory_id', products, {'product_name': 'product_name'})
+    attach_related(records, 'employee_id', load_employees(record['employee_id'] for record in records),
+                   {'name': 'employee_name'})
+    for record in records:
+        record['items'] = [item for item in items if item['service_record_id'] == record['service_record_id']]
+    appointment['service_records'] = records
+    return appointment
+
+# Exports: full-table dumps read with an unbuffered cursor in fixed-size
+# batches, so memory stays flat however many rows there are
+EXPORT_BATCH_SIZE = 1000
+EXPORT_QUERIES = {
+    "appointments": """
+        SELECT appointment_id, vehicle_id, service_package_id, appointment_date, appointment_time, status
+        FROM Appointments ORDER BY appointment_id
+    """,
+    "service_records": """
+        SELECT service_record_id, appointment_id, employee_id, details, duration
+        FROM Service_Records ORDER BY service_record_id
+    """,
+    "service_record_inventory": """
+        SELECT service_record_id, inventory_id, quantity_used
+        FROM ServiceRecord_Inventory ORDER BY service_record_id, inventory_id
+    """,
+    "inventory_ledger": """
+        SELECT entry_id, inventory_id, delta, reason, service_record_id, created_at
+        FROM Inventory_Ledger ORDER BY entry_id
+    """,
+}
+
+def stream_export(name):
+    """Yield the column names, then lists of row tuples of up to EXPORT_BATCH_SIZE."""
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(buffered=False)
+    started = finished = False
+    try:
+        cursor.execute(EXPORT_QUERIES[name])
+        started = True
+        yield cursor.column_names
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            yield rows
+        finished = True
+    finally:
+        if started and not finished:
+            # The client went away mid-stream; drain the result so the
+            # connection can be reused
+            conn.consume_results()
+        cursor.close()
+        conn.close()
+
 # Inventory-related operations
 def add_inventory(product_name, quantity, reorder_level):
     conn = get_db_connection()
@@ -218,18 +999,30 @@ def add_inventory(product_name, quantity, reorder_level):
             "INSERT INTO Inventory (product_name, quantity, reorder_level) VALUES (%s, %s, %s)",
             (product_name, quantity, reorder_level),
         )
+        # The opening stock is already in the snapshot; the ledger entry is
+        # recorded as compacted so the audit trail starts from it
+        cursor.execute("""
+            INSERT INTO Inventory_Ledger (inventory_id, delta, reason, compacted)
+            VALUES (%s, %s, 'restock', TRUE)
+        """, (cursor.lastrowid, quantity))
         conn.commit()
+        _bump_counters({"Inventory": 1})
+        invalidate("Inventory")
     finally:
         cursor.close()
         conn.close()
 
-def get_inventory():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+def get_inventory(low_stock=False, limit=None, after=None, sort=None, order="asc", fields=None):
+    columns = _columns(fields, INVENTORY_FIELDS, "inventory_id", sort or "inventory_id")
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True)
     try:
-        cursor.execute("SELECT * FROM Inventory")
-        inventory = cursor.fetchall()
-        return inventory
+        conditions = ["quantity < reorder_level"] if low_stock else []
+        inventory = _paged_select(
+            cursor, f"SELECT {columns} FROM Inventory_Current", conditions, [], INVENTORY_SORTS, "inventory_id",
+            sort, order, after, limit
+        )
+        return Rows.from_cursor(cursor, inventory)
     finally:
         cursor.close()
         conn.close()
@@ -238,11 +1031,169 @@ def update_inventory(inventory_id, product_name, reorder_level, quantity):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
+        # The new quantity is recorded as a ledger entry for the difference
+        # from the current stock, not written over the snapshot
+        current = _locked_stock(cursor, [inventory_id]).get(inventory_id)
+        if current is None:
+            return False
+        cursor.execute("SELECT reorder_level FROM Inventory WHERE inventory_id = %s", (inventory_id,))
+        previous_reorder_level = cursor.fetchone()[0]
+        quantity, reorder_level = int(quantity), int(reorder_level)
+        delta = quantity - current
+        if delta:
+            cursor.execute("""
+                INSERT INTO Inventory_Ledger (inventory_id, delta, reason) VALUES (%s, %s, %s)
+            """, (inventory_id, delta, 'restock' if delta > 0 else 'adjustment'))
         cursor.execute(
-            "UPDATE Inventory SET product_name = %s, quantity = %s, reorder_level = %s WHERE inventory_id = %s",
-            (product_name, quantity, reorder_level, inventory_id),
+            "UPDATE Inventory SET product_name = %s, reorder_level = %s WHERE inventory_id = %s",
+            (product_name, reorder_level, inventory_id),
         )
+        _publish(cursor, "inventory.updated", inventory_id=inventory_id, product_name=product_name,
+                 quantity=quantity, reorder_level=reorder_level, delta=delta)
+        if current >= previous_reorder_level and quantity < reorder_level:
+            _publish(cursor, "inventory.low_stock", inventory_id=inventory_id, product_name=product_name,
+                     quantity=quantity, reorder_level=reorder_level)
         conn.commit()
+        invalidate("Inventory")
+        return True
+    finally:
+        cursor.close()
+        conn.close()
+
+# Inventory ledger: every stock movement is recorded in Inventory_Ledger,
+# which keeps the audit trail. Restocks and adjustments are appended and
+# compacted into Inventory.quantity (the snapshot) in the background;
+# bookings take their stock straight off the snapshot in a short
+# transaction of their own (see _reserve_stock) and record it as already
+# compacted. Current stock is the snapshot plus the entries not yet
+# compacted; see Inventory_Current.
+LEDGER_COMPACT_BATCH = 5000
+
+def _locked_stock(cursor, inventory_ids):
+    """Lock the Inventory rows in id order and return {inventory_id: current quantity}.
+
+    Locking reads see the latest committed ledger entries, so the result
+    cannot be stale while the row locks are held.
+    """
+    inventory_ids = sorted(inventory_ids)
+    placeholders = ", ".join(["%s"] * len(inventory_ids))
+    cursor.execute(f"""
+        SELECT inventory_id, quantity FROM Inventory
+        WHERE inventory_id IN ({placeholders})
+        ORDER BY inventory_id
+        FOR UPDATE
+    """, tuple(inventory_ids))
+    stock = dict(cursor.fetchall())
+    cursor.execute(f"""
+        SELECT inventory_id, SUM(delta) FROM Inventory_Ledger
+        WHERE inventory_id IN ({placeholders}) AND compacted = FALSE
+        GROUP BY inventory_id
+        FOR SHARE
+    """, tuple(inventory_ids))
+    for inventory_id, delta in cursor.fetchall():
+        stock[inventory_id] += int(delta)
+    return stock
+
+def compact_inventory_ledger(batch_size=LEDGER_COMPACT_BATCH):
+    """Fold pending ledger entries into the Inventory snapshots.
+
+    Returns the number of entries folded. Entries stay in the ledger,
+    marked compacted, as the audit trail.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+        cursor.execute("""
+            SELECT DISTINCT inventory_id FROM Inventory_Ledger
+            WHERE compacted = FALSE
+            ORDER BY inventory_id
+        """)
+        inventory_ids = [row[0] for row in cursor.fetchall()]
+        if not inventory_ids:
+            conn.rollback()
+            return 0
+        # Same lock order as bookings: Inventory rows first, then ledger rows
+        placeholders = ", ".join(["%s"] * len(inventory_ids))
+        cursor.execute(f"""
+            SELECT inventory_id FROM Inventory
+            WHERE inventory_id IN ({placeholders})
+            ORDER BY inventory_id
+            FOR UPDATE
+        """, tuple(inventory_ids))
+        cursor.fetchall()
+        cursor.execute(f"""
+            SELECT entry_id, inventory_id, delta FROM Inventory_Ledger
+            WHERE compacted = FALSE AND inventory_id IN ({placeholders})
+            ORDER BY entry_id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, tuple(inventory_ids) + (batch_size,))
+        entries = cursor.fetchall()
+        if not entries:
+            conn.rollback()
+            return 0
+
+        totals = {}
+        for _, inventory_id, delta in entries:
+            totals[inventory_id] = totals.get(inventory_id, 0) + delta
+        ids = sorted(totals)
+        cases = " ".join(["WHEN %s THEN %s"] * len(ids))
+        params = [value for inventory_id in ids for value in (inventory_id, totals[inventory_id])]
+        cursor.execute(f"""
+            UPDATE Inventory
+            SET quantity = quantity + CASE inventory_id {cases} END
+            WHERE inventory_id IN ({", ".join(["%s"] * len(ids))})
+        """, tuple(params + ids))
+        entry_ids = [entry_id for entry_id, _, _ in entries]
+        cursor.execute(f"""
+            UPDATE Inventory_Ledger SET compacted = TRUE
+            WHERE entry_id IN ({", ".join(["%s"] * len(entry_ids))})
+        """, tuple(entry_ids))
+        conn.commit()
+        # Current stock is unchanged, but the snapshots and compacted flags moved
+        invalidate("Inventory")
+        return len(entries)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+_compactor_started = False
+_compactor_lock = threading.Lock()
+
+def start_ledger_compactor(interval):
+    """Run compact_inventory_ledger() every `interval` seconds on a daemon thread."""
+    global _compactor_started
+    with _compactor_lock:
+        if _compactor_started or interval <= 0:
+            return
+        _compactor_started = True
+
+    def run():
+        while True:
+            sleep(interval)
+            try:
+                while compact_inventory_ledger() == LEDGER_COMPACT_BATCH:
+                    pass
+            except Exception as e:
+                print(f"Inventory ledger compaction failed: {e}")
+
+    threading.Thread(target=run, name="ledger-compactor", daemon=True).start()
+
+def get_inventory_ledger(inventory_id, limit=None, after=None, order="desc"):
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True, dictionary=True)
+    try:
+        return _paged_select(
+            cursor, """
+                SELECT entry_id, inventory_id, delta, reason, service_record_id, created_at, compacted
+                FROM Inventory_Ledger
+            """, ["inventory_id = %s"], [inventory_id], {"entry_id": "entry_id"}, "entry_id",
+            "entry_id", order, after, limit
+        )
     finally:
         cursor.close()
         conn.close()
@@ -257,81 +1208,285 @@ def add_employee(name, email, phone, is_active=True):
             (name, email, phone, is_active),
         )
         conn.commit()
+        invalidate("Employees")
     finally:
         cursor.close()
         conn.close()
 
-def get_employees():
+def get_employees(is_active=None, limit=None, after=None, sort=None, order="asc", fields=None):
+    columns = _columns(fields, EMPLOYEE_FIELDS, "employee_id", sort or "employee_id")
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True)
+    try:
+        conditions, params = [], []
+        if is_active is not None:
+            conditions.append("is_active = %s")
+            params.append(is_active)
+        employees = _paged_select(
+            cursor, f"SELECT {columns} FROM Employees", conditions, params, EMPLOYEE_SORTS, "employee_id",
+            sort, order, after, limit
+        )
+        return Rows.from_cursor(cursor, employees)
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_available_slots(date, package_id, employee_id=None):
+    """Start times on `date` with a free bay and at least one free active employee."""
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Employees")
-        employees = cursor.fetchall()
-        return employees
+        cursor.execute(
+            "SELECT duration FROM Service_Packages WHERE service_package_id = %s", (package_id,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise InvalidQueryError(f"Unknown service package {package_id}")
+        if employee_id is not None:
+            employee_ids = [int(employee_id)]
+        else:
+            cursor.execute("SELECT employee_id FROM Employees WHERE is_active = TRUE ORDER BY employee_id")
+            employee_ids = [employee for (employee,) in cursor.fetchall()]
     finally:
         cursor.close()
         conn.close()
+    duration = row[0] or DEFAULT_DURATION
+    return {'date': str(date), 'duration': duration, 'slots': availability.free_slots(date, duration, employee_ids)}
+
+class InsufficientStockError(Exception):
+    """Raised when a booking would take an inventory item below zero."""
+
+class SlotUnavailableError(Exception):
+    """Raised when a booking overlaps the employee's other appointments or no bay is free."""
+
+# Deadlocks and lock-wait timeouts roll the booking back; retry it a few
+# times with jittered backoff before giving up
+BOOKING_RETRIES = 3
+RETRYABLE_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+def _retrying(func, *args):
+    """Call func(*args), retrying deadlocks and lock wait timeouts with backoff."""
+    for attempt in range(1, BOOKING_RETRIES + 1):
+        try:
+            return func(*args)
+        except mysql.connector.Error as e:
+            if e.errno not in RETRYABLE_ERRORS or attempt == BOOKING_RETRIES:
+                raise
+            sleep(random.uniform(0, 0.05 * 2 ** attempt))
 
 def add_schedule_appointment(customer_id, vehicle_id, package_id, employee_id, date, time, service_details, service_duration, inventory_items):
+    needed = {}
+    for item in inventory_items:
+        quantity = int(item['quantity'])
+        if quantity <= 0:
+            raise InsufficientStockError(f"Quantity for item {item['inventory_id']} must be positive")
+        needed[int(item['inventory_id'])] = needed.get(int(item['inventory_id']), 0) + quantity
+    # The stock is taken first, in a transaction of its own, so an item's
+    # row is only locked for that short transaction rather than for the
+    # whole booking; it is put back if the booking then fails
+    reserved = _retrying(_reserve_stock, needed) if needed else {}
+    try:
+        return _retrying(
+            _add_schedule_appointment, vehicle_id, package_id, employee_id, date, time,
+            service_details, service_duration, needed, reserved
+        )
+    except Exception:
+        if reserved:
+            _release_stock(needed, reserved)
+        raise
+
+def _reserve_stock(needed):
+    """Take `needed` ({inventory_id: quantity}) off the Inventory snapshots and commit.
+
+    Each item is taken with one conditional UPDATE against its current
+    stock (snapshot plus pending ledger entries), in inventory_id order, so
+    bookings cannot overdraw an item or deadlock on each other. The
+    consumption goes into the ledger as already compacted and is linked to
+    its service record by the booking. Returns {inventory_id: (entry_id,
+    product_name, remaining quantity, reorder_level)}.
+    """
+    inventory_ids = sorted(needed)
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        entries = {}
+        for inventory_id in inventory_ids:
+            cursor.execute("""
+                UPDATE Inventory SET quantity = quantity - %s
+                WHERE inventory_id = %s AND quantity + COALESCE((
+                    SELECT SUM(delta) FROM Inventory_Ledger
+                    WHERE Inventory_Ledger.inventory_id = %s AND compacted = FALSE
+                ), 0) >= %s
+            """, (needed[inventory_id], inventory_id, inventory_id, needed[inventory_id]))
+            if not cursor.rowcount:
+                cursor.execute(
+                    "SELECT product_name, quantity FROM Inventory_Current WHERE inventory_id = %s", (inventory_id,)
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    raise InsufficientStockError(f"Inventory item {inventory_id} does not exist")
+                raise InsufficientStockError(f"Only {row[1]} of '{row[0]}' in stock, {needed[inventory_id]} needed")
+            cursor.execute("""
+                INSERT INTO Inventory_Ledger (inventory_id, delta, reason, compacted)
+                VALUES (%s, %s, 'consumption', TRUE)
+            """, (inventory_id, -needed[inventory_id]))
+            entries[inventory_id] = cursor.lastrowid
+        cursor.execute(f"""
+            SELECT inventory_id, product_name, quantity, reorder_level FROM Inventory_Current
+            WHERE inventory_id IN ({", ".join(["%s"] * len(inventory_ids))})
+        """, tuple(inventory_ids))
+        reserved = {row[0]: (entries[row[0]],) + tuple(row[1:]) for row in cursor.fetchall()}
+        # Nothing is invalidated here: the booking does it when it commits,
+        # and a failed booking puts the stock back
+        conn.commit()
+        return reserved
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+def _release_stock(needed, reserved):
+    """Put back stock taken by _reserve_stock() for a booking that failed."""
+    def release():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            for inventory_id in sorted(reserved):
+                cursor.execute(
+                    "UPDATE Inventory SET quantity = quantity + %s WHERE inventory_id = %s",
+                    (needed[inventory_id], inventory_id)
+                )
+            entry_ids = [entry[0] for entry in reserved.values()]
+            cursor.execute(
+                f"DELETE FROM Inventory_Ledger WHERE entry_id IN ({', '.join(['%s'] * len(entry_ids))})",
+                tuple(entry_ids)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+    try:
+        _retrying(release)
+    except Exception as e:
+        # The consumption entries stay in the ledger without a service record
+        print(f"Could not put back stock reserved for a failed booking {reserved}: {e}")
+
+def _add_schedule_appointment(vehicle_id, package_id, employee_id, date, time, service_details, service_duration, needed, reserved):
+    inventory_ids = sorted(needed)
+
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        # Step 1: Insert into Appointments table
+        # Step 1: Check the slot. The employee's row lock serializes their
+        # bookings, and the day is re-read after the lock (the rollback drops
+        # the earlier read snapshot) so two requests cannot both take the
+        # same employee's time. When bays are limited, the day's
+        # Appointment_Daily_Counts row is locked as well, so bookings for the
+        # same day count the bays one at a time. The cached day schedule is
+        # not trusted here: it can miss a cancellation made by another
+        # worker until it is reloaded.
+        duration = service_duration
+        if not duration:
+            cursor.execute(
+                "SELECT duration FROM Service_Packages WHERE service_package_id = %s", (package_id,)
+            )
+            row = cursor.fetchone()
+            duration = row[0] if row else DEFAULT_DURATION
+        conn.rollback()
+        if employee_id is not None:
+            cursor.execute("SELECT employee_id FROM Employees WHERE employee_id = %s FOR UPDATE", (employee_id,))
+            cursor.fetchall()
+        if BAY_COUNT is not None:
+            cursor.execute("""
+                INSERT INTO Appointment_Daily_Counts (day, appointments) VALUES (%s, 0)
+                ON DUPLICATE KEY UPDATE appointments = appointments
+            """, (date,))
+        schedule = availability.refresh(date, cursor)
+        conflicts = availability.conflicts(date, time, duration, employee_id, schedule=schedule)
+        if conflicts:
+            raise SlotUnavailableError("; ".join(conflicts))
+
+        # Step 2: The stock was already taken by _reserve_stock()
+
+        # Step 3: Insert into Appointments table
         cursor.execute("""
             INSERT INTO Appointments (vehicle_id, service_package_id, appointment_date, appointment_time, status)
             VALUES (%s, %s, %s, %s, %s)
         """, (vehicle_id, package_id, date, time, 'scheduled'))
-        
-        # Get the newly created appointment_id
         appointment_id = cursor.lastrowid
 
-        # Step 2: Insert into Service_Records table
+        # Step 4: Insert into Service_Records table
         cursor.execute("""
             INSERT INTO Service_Records (appointment_id, employee_id, details, duration)
             VALUES (%s, %s, %s, %s)
         """, (appointment_id, employee_id, service_details, service_duration))
-        
-        # Get the newly created service_record_id
         service_record_id = cursor.lastrowid
 
-        # Step 3: Insert into ServiceRecord_Inventory table for each inventory item used
-        for item in inventory_items:
-            cursor.execute("""
+        if inventory_ids:
+            # Step 5: Record the items used with one multi-row insert
+            cursor.executemany("""
                 INSERT INTO ServiceRecord_Inventory (service_record_id, inventory_id, quantity_used)
                 VALUES (%s, %s, %s)
-            """, (service_record_id, item['inventory_id'], item['quantity']))
-            
-            # Step 4: Update inventory quantity in the Inventory table
-            cursor.execute("""
-                UPDATE Inventory
-                SET quantity = quantity - %s
-                WHERE inventory_id = %s
-            """, (item['quantity'], item['inventory_id']))
-        
+            """, [(service_record_id, inventory_id, needed[inventory_id]) for inventory_id in inventory_ids])
+
+            # Step 6: Link the consumption entries to the service record
+            entry_ids = [reserved[inventory_id][0] for inventory_id in inventory_ids]
+            cursor.execute(f"""
+                UPDATE Inventory_Ledger SET service_record_id = %s
+                WHERE entry_id IN ({", ".join(["%s"] * len(entry_ids))})
+            """, (service_record_id, *entry_ids))
+
+            # Step 7: Publish the stock changes
+            for inventory_id in inventory_ids:
+                _, product_name, remaining, reorder_level = reserved[inventory_id]
+                _publish(cursor, "inventory.updated", inventory_id=inventory_id, product_name=product_name,
+                         delta=-needed[inventory_id], reason="consumption", appointment_id=appointment_id)
+                if remaining + needed[inventory_id] >= reorder_level > remaining:
+                    _publish(cursor, "inventory.low_stock", inventory_id=inventory_id, product_name=product_name,
+                             quantity=remaining, reorder_level=reorder_level)
+
+        _publish(cursor, "appointment.scheduled", appointment_id=appointment_id, vehicle_id=int(vehicle_id),
+                 service_package_id=int(package_id), employee_id=int(employee_id) if employee_id is not None else None,
+                 date=date, time=time, duration=int(duration), status='scheduled')
+
         # Commit the transaction
         conn.commit()
-
-        print(f"Appointment {appointment_id} scheduled successfully.")
-    except Exception as e:
-        # Rollback if any error occurs
+        _bump_counters(
+            {"Appointments": 1}, [(date, package_id, 1)],
+            [(date, inventory_id, needed[inventory_id]) for inventory_id in inventory_ids]
+        )
+        invalidate("Appointments", "Service_Records", "ServiceRecord_Inventory", "Inventory")
+        availability.record(date, time, duration, appointment_id, int(employee_id) if employee_id is not None else None)
+        return appointment_id
+    except Exception:
         conn.rollback()
-        print(f"Error scheduling appointment: {e}")
+        raise
     finally:
-        # Close the connection
         cursor.close()
         conn.close()
 
 
-def get_monthly_appointments():
-    conn = get_db_connection()
+@cached("Appointments")
+def get_monthly_appointments(months=12):
+    """Appointment totals for the last `months` calendar months, oldest first."""
+    today = date.today()
+    first_month = today.year * 12 + today.month - months
+    start = date(first_month // 12, first_month % 12 + 1, 1)
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor(dictionary=True)
     try:
         cursor.execute("""
-            SELECT MONTH(appointment_date) AS month, COUNT(*) AS appointments
-            FROM Appointments
-            GROUP BY month
-            ORDER BY month
-        """)
+            SELECT YEAR(day) AS year, MONTH(day) AS month, CAST(SUM(appointments) AS SIGNED) AS appointments
+            FROM Appointment_Daily_Counts
+            WHERE day >= %s
+            GROUP BY year, month
+            ORDER BY year, month
+        """, (start,))
         appointments = cursor.fetchall()
         return appointments
     finally:
@@ -339,14 +1494,15 @@ def get_monthly_appointments():
         conn.close()
 
 
+@cached("Service_Packages", "Appointments")
 def get_service_chart_data():
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor(dictionary=True)
     try:
         cursor.execute("""
-            SELECT Service_Packages.package_name AS name, COUNT(*) AS value
+            SELECT Service_Packages.package_name AS name, CAST(SUM(Package_Daily_Usage.appointments) AS SIGNED) AS value
             FROM Service_Packages
-            JOIN Appointments ON Service_Packages.service_package_id = Appointments.service_package_id
+            JOIN Package_Daily_Usage ON Service_Packages.service_package_id = Package_Daily_Usage.service_package_id
             GROUP BY Service_Packages.package_name
         """)
         data = cursor.fetchall()
@@ -356,18 +1512,19 @@ def get_service_chart_data():
         conn.close()
 
 
+@cached("Inventory", "ServiceRecord_Inventory")
 def inventory_usage():
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor(dictionary=True)
     try:
         cursor.execute("""
             SELECT
                 Inventory.product_name AS name,
-                SUM(ServiceRecord_Inventory.quantity_used) AS value
+                CAST(SUM(Inventory_Daily_Usage.quantity_used) AS SIGNED) AS value
             FROM
-                ServiceRecord_Inventory
+                Inventory_Daily_Usage
             JOIN
-                Inventory ON ServiceRecord_Inventory.inventory_id = Inventory.inventory_id
+                Inventory ON Inventory_Daily_Usage.inventory_id = Inventory.inventory_id
             GROUP BY
                 Inventory.product_name
         """)
@@ -377,14 +1534,15 @@ def inventory_usage():
         cursor.close()
         conn.close()
 
+@cached("Appointments")
 def get_appointments_today():
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor(dictionary=True)
     try:
         cursor.execute("""
-            SELECT COUNT(*) AS appointments_today
-            FROM Appointments
-            WHERE appointment_date = CURDATE()
+            SELECT COALESCE(SUM(appointments), 0) AS appointments_today
+            FROM Appointment_Daily_Counts
+            WHERE day = CURDATE()
         """)
         appointments = cursor.fetchone()
         return appointments
@@ -393,13 +1551,14 @@ def get_appointments_today():
         conn.close()
 
 
+@cached("Inventory")
 def get_low_inventory():
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor(dictionary=True)
     try:
         cursor.execute("""
             SELECT COUNT(*) AS low_inventory_items
-            FROM Inventory
+            FROM Inventory_Current
             WHERE quantity < reorder_level
         """)
         inventory = cursor.fetchone()
@@ -410,8 +1569,8 @@ def get_low_inventory():
 
 
 def get_upcoming_appointments():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(prepared=True, dictionary=True)
     try:
         cursor.execute("""
             SELECT
@@ -440,3 +1599,270 @@ def get_upcoming_appointments():
         cursor.close()
         conn.close()
 
+
+# Bulk import: rows are validated, related names resolved and duplicates
+# checked once per batch, then inserted with a multi-row executemany. The
+# whole import is one transaction; rows that fail validation are skipped
+# and reported by their 1-based position in the input.
+IMPORT_BATCH_SIZE = 1000
+
+def _required_text(row, field, max_length):
+    value = row.get(field)
+    if value is None or not str(value).strip():
+        raise ValueError(f"{field} is required")
+    value = str(value).strip()
+    if len(value) > max_length:
+        raise ValueError(f"{field} must be at most {max_length} characters")
+    return value
+
+def _optional_text(row, field, max_length=None):
+    value = row.get(field)
+    if value is None or not str(value).strip():
+        return None
+    value = str(value).strip()
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f"{field} must be at most {max_length} characters")
+    return value
+
+def _non_negative_int(row, field):
+    try:
+        value = int(row.get(field))
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be an integer")
+    if value < 0:
+        raise ValueError(f"{field} must not be negative")
+    return value
+
+def _validate_customer(row):
+    email = _required_text(row, "email", 255)
+    if "@" not in email:
+        raise ValueError("email is not a valid address")
+    return {
+        "name": _required_text(row, "name", 255),
+        "email": email,
+        "phone": _optional_text(row, "phone", 20),
+        "address": _optional_text(row, "address"),
+    }
+
+def _validate_vehicle(row):
+    model_year = _optional_text(row, "model_year", 4) or _optional_text(row, "make_year", 4)
+    if model_year is not None and not (len(model_year) == 4 and model_year.isascii() and model_year.isdigit()):
+        raise ValueError("model_year must be a 4-digit year")
+    customer_id = row.get("customer_id")
+    if customer_id not in (None, ""):
+        try:
+            customer_id = int(customer_id)
+        except (TypeError, ValueError):
+            raise ValueError("customer_id must be an integer")
+        customer_name = None
+    else:
+        customer_id = None
+        customer_name = _required_text(row, "customer_name", 255)
+    return {
+        "customer_id": customer_id,
+        "customer_name": customer_name,
+        "model_year": model_year,
+        "license_plate": _required_text(row, "license_plate", 255),
+    }
+
+def _validate_inventory(row):
+    return {
+        "product_name": _required_text(row, "product_name", 255),
+        "quantity": _non_negative_int(row, "quantity"),
+        "reorder_level": _non_negative_int(row, "reorder_level"),
+    }
+
+def _existing_values(cursor, table, column, values):
+    if not values:
+        return set()
+    placeholders = ", ".join(["%s"] * len(values))
+    cursor.execute(f"SELECT {column} FROM {table} WHERE {column} IN ({placeholders})", tuple(values))
+    return {row[0] for row in cursor.fetchall()}
+
+def _resolve_customers(cursor, batch, errors):
+    """Fill in customer_id from customer_name with one query per batch."""
+    names = sorted({record["customer_name"] for _, record in batch if record["customer_id"] is None})
+    ids_by_name = {}
+    if names:
+        placeholders = ", ".join(["%s"] * len(names))
+        cursor.execute(
+            f"SELECT name, customer_id FROM Customers WHERE name IN ({placeholders})", tuple(names)
+        )
+        for name, customer_id in cursor.fetchall():
+            ids_by_name.setdefault(name, []).append(customer_id)
+    known_ids = _existing_values(
+        cursor, "Customers", "customer_id",
+        sorted({record["customer_id"] for _, record in batch if record["customer_id"] is not None})
+    )
+    resolved = []
+    for line, record in batch:
+        if record["customer_id"] is None:
+            matches = ids_by_name.get(record["customer_name"], [])
+            if len(matches) != 1:
+                problem = "No customer" if not matches else "More than one customer"
+                errors.append({"row": line, "error": f"{problem} named '{record['customer_name']}'"})
+                continue
+            record["customer_id"] = matches[0]
+        elif record["customer_id"] not in known_ids:
+            errors.append({"row": line, "error": f"No customer with id {record['customer_id']}"})
+            continue
+        resolved.append((line, record))
+    return resolved
+
+BULK_IMPORTS = {
+    "customers": {
+        "table": "Customers",
+        "columns": ("name", "email", "phone", "address"),
+        "unique": "email",
+        "validate": _validate_customer,
+    },
+    "vehicles": {
+        "table": "Vehicles",
+        "columns": ("customer_id", "model_year", "license_plate"),
+        "unique": "license_plate",
+        "validate": _validate_vehicle,
+        "resolve": _resolve_customers,
+    },
+    "inventory": {
+        "table": "Inventory",
+        "columns": ("product_name", "quantity", "reorder_level"),
+        "validate": _validate_inventory,
+        "opening_stock": "quantity",
+    },
+}
+
+def bulk_import(kind, rows, batch_size=IMPORT_BATCH_SIZE):
+    """Insert an iterable of dicts; returns {'inserted': n, 'errors': [...]}."""
+    spec = BULK_IMPORTS[kind]
+    if batch_size < 1:
+        raise InvalidQueryError("batch_size must be positive")
+    columns = spec["columns"]
+    insert_sql = (
+        f"INSERT INTO {spec['table']} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    unique = spec.get("unique")
+    seen = set()
+    errors = []
+    inserted = 0
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        batch = []
+        for line, row in enumerate(rows, start=1):
+            try:
+                if not isinstance(row, dict):
+                    raise ValueError("row must be an object of column values")
+                batch.append((line, spec["validate"](row)))
+            except ValueError as e:
+                errors.append({"row": line, "error": str(e)})
+            if len(batch) < batch_size:
+                continue
+            inserted += _insert_batch(cursor, spec, insert_sql, unique, batch, seen, errors)
+            batch = []
+        if batch:
+            inserted += _insert_batch(cursor, spec, insert_sql, unique, batch, seen, errors)
+        conn.commit()
+        _bump_counters({spec["table"]: inserted})
+        invalidate(spec["table"])
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    errors.sort(key=lambda error: error["row"])
+    return {"inserted": inserted, "errors": errors}
+
+def _insert_batch(cursor, spec, insert_sql, unique, batch, seen, errors):
+    if "resolve" in spec:
+        batch = spec["resolve"](cursor, batch, errors)
+    if unique:
+        existing = _existing_values(
+            cursor, spec["table"], unique, sorted({record[unique] for _, record in batch})
+        )
+        # MySQL compares these columns case-insensitively, so do the same here
+        existing = {value.lower() for value in existing}
+        accepted = []
+        for line, record in batch:
+            value = record[unique]
+            if value.lower() in existing or value.lower() in seen:
+                errors.append({"row": line, "error": f"{unique} '{value}' already exists"})
+                continue
+            seen.add(value.lower())
+            accepted.append((line, record))
+        batch = accepted
+    if not batch:
+        return 0
+    values = [tuple(record[column] for column in spec["columns"]) for _, record in batch]
+    if "opening_stock" not in spec:
+        cursor.executemany(insert_sql, values)
+        return len(batch)
+    # Like add_inventory, each item gets a compacted opening entry in the
+    # ledger. A multi-row insert only reports its first id, so the items are
+    # inserted one by one and their entries written together
+    entries = []
+    for (_, record), row in zip(batch, values):
+        cursor.execute(insert_sql, row)
+        entries.append((cursor.lastrowid, record[spec["opening_stock"]]))
+    cursor.executemany("""
+        INSERT INTO Inventory_Ledger (inventory_id, delta, reason, compacted)
+        VALUES (%s, %s, 'restock', TRUE)
+    """, entries)
+    return len(batch)
+
+# Time series over the daily rollups
+SERIES_BUCKETS = {
+    "day": "day",
+    "week": "SUBDATE(day, WEEKDAY(day))",
+    "month": "SUBDATE(day, DAYOFMONTH(day) - 1)",
+    "year": "MAKEDATE(YEAR(day), 1)",
+}
+
+def _series(select, table, join, group, start, end, granularity):
+    if granularity not in SERIES_BUCKETS:
+        raise InvalidQueryError(f"granularity must be one of {', '.join(SERIES_BUCKETS)}")
+    bucket = SERIES_BUCKETS[granularity]
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"""
+            SELECT {bucket} AS bucket, {select}
+            FROM {table} {join}
+            WHERE {table}.day BETWEEN %s AND %s
+            GROUP BY bucket{group}
+            ORDER BY bucket
+        """, (start, end))
+        rows = cursor.fetchall()
+        for row in rows:
+            row['bucket'] = str(row['bucket'])
+        return rows
+    finally:
+        cursor.close()
+        conn.close()
+
+@cached("Appointments")
+def get_appointment_series(start, end, granularity="day"):
+    return _series(
+        "CAST(SUM(appointments) AS SIGNED) AS appointments",
+        "Appointment_Daily_Counts", "", "", start, end, granularity
+    )
+
+@cached("Appointments", "Service_Packages")
+def get_package_series(start, end, granularity="day"):
+    return _series(
+        "Service_Packages.package_name AS name, CAST(SUM(Package_Daily_Usage.appointments) AS SIGNED) AS appointments",
+        "Package_Daily_Usage",
+        "JOIN Service_Packages ON Package_Daily_Usage.service_package_id = Service_Packages.service_package_id",
+        ", Service_Packages.package_name", start, end, granularity
+    )
+
+@cached("ServiceRecord_Inventory", "Inventory")
+def get_inventory_series(start, end, granularity="day"):
+    return _series(
+        "Inventory.product_name AS name, CAST(SUM(Inventory_Daily_Usage.quantity_used) AS SIGNED) AS quantity_used",
+        "Inventory_Daily_Usage",
+        "JOIN Inventory ON Inventory_Daily_Usage.inventory_id = Inventory.inventory_id",
+        ", Inventory.product_name", start, end, granularity
+    )
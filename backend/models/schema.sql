@@ -1,106 +1,185 @@
+-- SQLite schema, used when DB_ENGINE=sqlite (see sqlite_engine.py).
+-- It matches the MySQL schema from init_db() with every migration in
+-- migrations.py up to SQLITE_SCHEMA_VERSION applied. Text columns that MySQL
+-- compares case-insensitively are COLLATE NOCASE here, which also lets
+-- SQLite answer the LIKE prefix searches from their indexes.
 
--- -- Customers table: Stores customer information
--- CREATE TABLE Customers (
---     customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
---     name TEXT NOT NULL,
---     email TEXT UNIQUE NOT NULL,
---     phone TEXT,
---     address TEXT
--- );
--- -- Vehicles table: Stores vehicles owned by customers
--- CREATE TABLE Vehicles (
---     vehicle_id INTEGER PRIMARY KEY AUTOINCREMENT,
---     customer_id INTEGER NOT NULL,
---     make_year TEXT,
---     license_plate TEXT UNIQUE NOT NULL,
---     FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
---     ON DELETE CASCADE
---     ON UPDATE CASCADE
--- );
+-- Customers table: Stores customer information
+CREATE TABLE Customers (
+    customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL COLLATE NOCASE,
+    email TEXT UNIQUE NOT NULL COLLATE NOCASE,
+    phone TEXT COLLATE NOCASE,
+    address TEXT
+);
+CREATE INDEX idx_customers_name ON Customers (name);
+CREATE INDEX idx_customers_phone ON Customers (phone);
 
--- -- Service Packages table: Stores predefined service packages
--- CREATE TABLE Service_Packages (
---     service_package_id INTEGER PRIMARY KEY AUTOINCREMENT,
---     package_name TEXT NOT NULL,
---     package_description TEXT,
---     price REAL NOT NULL,
---     duration INTEGER NOT NULL
--- );
--- -- Appointments table: Stores appointments for vehicle services
--- CREATE TABLE Appointments (
---     appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
---     vehicle_id INTEGER NOT NULL,
---     service_package_id INTEGER NOT NULL,
---     appointment_date TEXT NOT NULL,
---     appointment_time TEXT NOT NULL,
---     status TEXT CHECK (
---         status IN ('scheduled', 'completed', 'cancelled')
---     ) NOT NULL,
---     FOREIGN KEY (vehicle_id) REFERENCES Vehicles(vehicle_id)
---     ON DELETE CASCADE
---     ON UPDATE CASCADE,
---     FOREIGN KEY (service_package_id) REFERENCES Service_Packages(service_package_id)
---     ON DELETE SET NULL
---     ON UPDATE CASCADE
--- );
+-- Vehicles table: Stores vehicles owned by customers
+CREATE TABLE Vehicles (
+    vehicle_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL,
+    model_year TEXT,
+    license_plate TEXT UNIQUE NOT NULL COLLATE NOCASE,
+    FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+);
+CREATE INDEX idx_vehicles_customer ON Vehicles (customer_id);
 
--- -- Employees table: Stores employees assigned to services
--- CREATE TABLE Employees (
---     employee_id INTEGER PRIMARY KEY AUTOINCREMENT,
---     name TEXT NOT NULL,
---     email TEXT UNIQUE,
---     phone TEXT,
---     is_active BOOLEAN NOT NULL DEFAULT 1
--- );
--- -- Service Records table: Tracks service details of each appointment
--- CREATE TABLE Service_Records (
---     service_record_id INTEGER PRIMARY KEY AUTOINCREMENT,
---     appointment_id INTEGER NOT NULL,
---     employee_id INTEGER,
---     details TEXT,
---     duration INTEGER,
---     FOREIGN KEY (appointment_id) REFERENCES Appointments(appointment_id)
---     ON DELETE CASCADE
---     ON UPDATE CASCADE,
---     FOREIGN KEY (employee_id) REFERENCES Employees(employee_id)
---     ON DELETE SET NULL
---     ON UPDATE CASCADE
--- );
+-- Service Packages table: Stores predefined service packages
+CREATE TABLE Service_Packages (
+    service_package_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    package_name TEXT NOT NULL COLLATE NOCASE,
+    package_description TEXT,
+    price DECIMAL(10, 2) NOT NULL,
+    duration INTEGER NOT NULL
+);
 
--- -- Inventory table: Tracks inventory details for service usage
--- CREATE TABLE Inventory (
---     inventory_id INTEGER PRIMARY KEY AUTOINCREMENT,
---     product_name TEXT NOT NULL,
---     quantity INTEGER NOT NULL,
---     reorder_level INTEGER NOT NULL
--- );
--- -- ServiceRecord_Inventory table: Tracks inventory usage in services
--- CREATE TABLE ServiceRecord_Inventory (
---     service_record_id INTEGER NOT NULL,
---     inventory_id INTEGER NOT NULL,
---     quantity_used INTEGER NOT NULL,
---     PRIMARY KEY (service_record_id, inventory_id),
---     FOREIGN KEY (service_record_id) REFERENCES Service_Records(service_record_id)
---     ON DELETE CASCADE
---     ON UPDATE CASCADE,
---     FOREIGN KEY (inventory_id) REFERENCES Inventory(inventory_id)
---     ON DELETE CASCADE
---     ON UPDATE CASCADE
--- );
+-- Appointments table: Stores appointments for vehicle services
+CREATE TABLE Appointments (
+    appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vehicle_id INTEGER NOT NULL,
+    service_package_id INTEGER NULL,
+    appointment_date DATE NOT NULL,
+    appointment_time TIME NOT NULL,
+    status TEXT CHECK (
+        status IN ('scheduled', 'completed', 'cancelled')
+    ) NOT NULL,
+    FOREIGN KEY (vehicle_id) REFERENCES Vehicles(vehicle_id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+    FOREIGN KEY (service_package_id) REFERENCES Service_Packages(service_package_id)
+    ON DELETE SET NULL
+    ON UPDATE CASCADE
+);
+CREATE INDEX idx_appointments_vehicle ON Appointments (vehicle_id);
+CREATE INDEX idx_appointments_date_time ON Appointments (appointment_date, appointment_time);
+CREATE INDEX idx_appointments_status_date ON Appointments (status, appointment_date);
 
--- -- Feedback table: Tracks feedback for completed appointments
--- CREATE TABLE Feedback (
---     feedback_id INTEGER PRIMARY KEY AUTOINCREMENT,
---     appointment_id INTEGER NOT NULL,
---     customer_id INTEGER NOT NULL,
---     rating INTEGER CHECK (
---         rating BETWEEN 1 AND 5
---     ),
---     comments TEXT,
---     FOREIGN KEY (appointment_id) REFERENCES Appointments(appointment_id)
---     ON DELETE CASCADE
---     ON UPDATE CASCADE,
---     FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
---     ON DELETE CASCADE
---     ON UPDATE CASCADE
--- );
+-- Employees table: Stores employees assigned to services
+CREATE TABLE Employees (
+    employee_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL COLLATE NOCASE,
+    email TEXT UNIQUE COLLATE NOCASE,
+    phone TEXT,
+    is_active BOOLEAN NOT NULL DEFAULT 1
+);
+
+-- Service Records table: Tracks service details of each appointment
+CREATE TABLE Service_Records (
+    service_record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    appointment_id INTEGER NOT NULL,
+    employee_id INTEGER,
+    details TEXT,
+    duration INTEGER,
+    FOREIGN KEY (appointment_id) REFERENCES Appointments(appointment_id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+    FOREIGN KEY (employee_id) REFERENCES Employees(employee_id)
+    ON DELETE SET NULL
+    ON UPDATE CASCADE
+);
+CREATE INDEX idx_service_records_appointment ON Service_Records (appointment_id);
+CREATE INDEX idx_service_records_employee ON Service_Records (employee_id);
+
+-- Inventory table: Tracks inventory details for service usage
+CREATE TABLE Inventory (
+    inventory_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_name TEXT NOT NULL COLLATE NOCASE,
+    quantity INTEGER NOT NULL,
+    reorder_level INTEGER NOT NULL
+);
+CREATE INDEX idx_inventory_stock ON Inventory (quantity, reorder_level);
+
+-- ServiceRecord_Inventory table: Tracks inventory usage in services
+CREATE TABLE ServiceRecord_Inventory (
+    service_record_id INTEGER NOT NULL,
+    inventory_id INTEGER NOT NULL,
+    quantity_used INTEGER NOT NULL,
+    PRIMARY KEY (service_record_id, inventory_id),
+    FOREIGN KEY (service_record_id) REFERENCES Service_Records(service_record_id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+    FOREIGN KEY (inventory_id) REFERENCES Inventory(inventory_id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+);
+CREATE INDEX idx_service_record_inventory_item ON ServiceRecord_Inventory (inventory_id);
+
+-- Feedback table: Tracks feedback for completed appointments
+CREATE TABLE Feedback (
+    feedback_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    appointment_id INTEGER NOT NULL,
+    customer_id INTEGER NOT NULL,
+    rating INTEGER CHECK (
+        rating BETWEEN 1 AND 5
+    ),
+    comments TEXT,
+    FOREIGN KEY (appointment_id) REFERENCES Appointments(appointment_id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+    FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+);
+CREATE INDEX idx_feedback_appointment ON Feedback (appointment_id);
+CREATE INDEX idx_feedback_customer ON Feedback (customer_id);
+
+-- Row totals kept up to date by the writers in models.py
+CREATE TABLE Row_Counts (
+    table_name TEXT PRIMARY KEY,
+    row_count INTEGER NOT NULL
+);
+INSERT INTO Row_Counts (table_name, row_count) VALUES
+    ('Customers', 0), ('Vehicles', 0), ('Appointments', 0), ('Inventory', 0);
+
+-- Daily rollups (migration 5)
+CREATE TABLE Appointment_Daily_Counts (
+    day DATE PRIMARY KEY,
+    appointments INTEGER NOT NULL
+);
+CREATE TABLE Package_Daily_Usage (
+    day DATE NOT NULL,
+    service_package_id INTEGER NOT NULL,
+    appointments INTEGER NOT NULL,
+    PRIMARY KEY (day, service_package_id),
+    FOREIGN KEY (service_package_id) REFERENCES Service_Packages(service_package_id)
+    ON DELETE CASCADE ON UPDATE CASCADE
+);
+CREATE TABLE Inventory_Daily_Usage (
+    day DATE NOT NULL,
+    inventory_id INTEGER NOT NULL,
+    quantity_used INTEGER NOT NULL,
+    PRIMARY KEY (day, inventory_id),
+    FOREIGN KEY (inventory_id) REFERENCES Inventory(inventory_id)
+    ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Append-only inventory ledger (migration 6)
+CREATE TABLE Inventory_Ledger (
+    entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    inventory_id INTEGER NOT NULL,
+    delta INTEGER NOT NULL,
+    reason TEXT NOT NULL CHECK (reason IN ('consumption', 'restock', 'adjustment')),
+    service_record_id INTEGER NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    compacted BOOLEAN NOT NULL DEFAULT 0,
+    FOREIGN KEY (inventory_id) REFERENCES Inventory(inventory_id)
+    ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (service_record_id) REFERENCES Service_Records(service_record_id)
+    ON DELETE SET NULL ON UPDATE CASCADE
+);
+CREATE INDEX idx_ledger_pending ON Inventory_Ledger (inventory_id, compacted);
+CREATE INDEX idx_ledger_compaction ON Inventory_Ledger (compacted, entry_id);
+
+CREATE VIEW Inventory_Current AS
+SELECT
+    Inventory.inventory_id,
+    Inventory.product_name,
+    CAST(Inventory.quantity + COALESCE(SUM(Inventory_Ledger.delta), 0) AS INTEGER) AS quantity,
+    Inventory.reorder_level
+FROM Inventory
+LEFT JOIN Inventory_Ledger
+    ON Inventory_Ledger.inventory_id = Inventory.inventory_id AND Inventory_Ledger.compacted = 0
+GROUP BY Inventory.inventory_id;
@@ -0,0 +1,149 @@
+"""JSON serialization of query results.
+
+List endpoints return `Rows`: the column description and the plain result
+tuples from the cursor. Converting a whole result set to JSON then needs no
+per-row dict: each query shape (its column names and MySQL types) gets a
+row encoder built once, with one converter per column, and the encoders
+are kept in a registry keyed by that shape.
+
+JSONProvider is the app's JSON provider. It sends Rows through that fast
+path and makes dates, TIME values and Decimals in any other response look
+the way the row encoder writes them.
+"""
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from functools import lru_cache
+from instrumentation import record_serialization
+from json.encoder import encode_basestring_ascii
+from mysql.connector import FieldType
+import json
+import threading
+import time
+
+
+def format_time(value):
+    """MySQL TIME (a timedelta) as 'HH:MM', the form the frontend sends back."""
+    total_seconds = int(value.total_seconds())
+    return f"{total_seconds // 3600:02d}:{total_seconds % 3600 // 60:02d}"
+
+
+def json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return format_time(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Rows):
+        return list(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_any(value):
+    return json.dumps(value, default=json_default)
+
+
+def _encode_text(value):
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    return _encode_any(value)
+
+
+@lru_cache(maxsize=4096)
+def _encode_date(value):
+    return '"' + value.isoformat() + '"'
+
+
+@lru_cache(maxsize=4096)
+def _encode_time(value):
+    return '"' + format_time(value) + '"'
+
+
+# Converters by MySQL column type; each takes a non-NULL value and returns
+# its JSON text. DECIMAL is written as a number with its exact digits.
+_CONVERTERS = {}
+for _type in (FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG,
+              FieldType.INT24, FieldType.YEAR):
+    _CONVERTERS[_type] = int.__str__
+for _type in (FieldType.DECIMAL, FieldType.NEWDECIMAL):
+    _CONVERTERS[_type] = str
+for _type in (FieldType.DATE, FieldType.DATETIME, FieldType.TIMESTAMP):
+    _CONVERTERS[_type] = _encode_date
+_CONVERTERS[FieldType.TIME] = _encode_time
+for _type in (FieldType.VARCHAR, FieldType.VAR_STRING, FieldType.STRING, FieldType.ENUM):
+    _CONVERTERS[_type] = _encode_text
+
+
+def _row_encoder(description):
+    """Compile `row -> JSON object text` for one query shape.
+
+    The encoder is generated source with each column's conversion inlined,
+    which avoids a function call and a zip per value.
+    """
+    template = "{" + ",".join(
+        encode_basestring_ascii(column[0]) + ":%s" for column in description
+    ) + "}"
+    namespace = {"template": template}
+    values = []
+    for i, column in enumerate(description):
+        namespace[f"c{i}"] = _CONVERTERS.get(column[1], _encode_any)
+        values.append(f'"null" if row[{i}] is None else c{i}(row[{i}])')
+    source = f"def encode(row):\n    return template % ({', '.join(values)},)\n"
+    exec(source, namespace)
+    return namespace["encode"]
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def row_encoder(description):
+    """The encoder for a query shape, built on first use."""
+    shape = tuple((column[0], column[1]) for column in description)
+    encoder = _encoders.get(shape)
+    if encoder is None:
+        with _encoders_lock:
+            encoder = _encoders.setdefault(shape, _row_encoder(shape))
+    return encoder
+
+
+class Rows(Sequence):
+    """A result set as (description, tuples). Indexing and iteration give dicts."""
+
+    def __init__(self, description, rows):
+        self.description = description
+        self.columns = tuple(column[0] for column in description)
+        self.rows = rows
+
+    @classmethod
+    def from_cursor(cls, cursor, rows):
+        return cls(cursor.description, rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Rows(self.description, self.rows[index])
+        return dict(zip(self.columns, self.rows[index]))
+
+    def to_json(self):
+        encode = row_encoder(self.description)
+        return ("[" + ",".join(map(encode, self.rows)) + "]\n").encode()
+
+
+class JSONProvider(DefaultJSONProvider):
+    default = staticmethod(json_default)
+
+    def response(self, *args, **kwargs):
+        started = time.perf_counter()
+        if len(args) == 1 and not kwargs and isinstance(args[0], Rows):
+            response = self._app.response_class(args[0].to_json(), mimetype=self.mimetype)
+        else:
+            response = super().response(*args, **kwargs)
+        record_serialization(time.perf_counter() - started)
+        return response
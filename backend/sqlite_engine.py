@@ -0,0 +1,270 @@
+"""SQLite storage engine for single-site installs (DB_ENGINE=sqlite).
+
+models.py is written against MySQL. Rather than keep a second copy of
+every query, this module makes a SQLite connection behave like the
+mysql.connector connections models.py expects:
+
+* statements are rewritten once per distinct SQL text: `%s` placeholders
+  become `?`, ON DUPLICATE KEY UPDATE becomes an ON CONFLICT upsert,
+  INSERT IGNORE becomes INSERT OR IGNORE, and locking clauses (FOR UPDATE,
+  FOR SHARE, SKIP LOCKED) are dropped;
+* MySQL's date and string functions used by the queries (CURDATE, YEAR,
+  SUBDATE, CONCAT, ...) are registered as SQLite functions;
+* DATE, TIME and DECIMAL columns come back as date, timedelta and
+  Decimal, the way mysql.connector returns them.
+
+SQLite allows one writer at a time, so a transaction that writes, or that
+reads with FOR UPDATE/FOR SHARE, starts with BEGIN IMMEDIATE. That
+takes the write lock up front, which gives those reads the same
+guarantee the row locks give under MySQL. Plain reads run outside any
+transaction and never block. Each thread keeps its own connection, with
+WAL enabled so readers and the writer do not wait for each other.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from dotenv import load_dotenv
+from functools import lru_cache
+from migrations import MIGRATIONS, SQLITE_MIGRATIONS, SQLITE_SCHEMA_VERSION
+import os
+import re
+import sqlite3
+import threading
+
+load_dotenv()
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "detailing.sqlite")
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))    # milliseconds
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "schema.sql")
+
+
+def _to_date(value):
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value if not isinstance(value, datetime) else value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def _parse_time(value):
+    parts = [int(part) for part in value.split(":")]
+    hours, minutes, seconds = (parts + [0, 0])[:3]
+    return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+
+def _format_time(value):
+    total_seconds = int(value.total_seconds())
+    return f"{total_seconds // 3600:02d}:{total_seconds % 3600 // 60:02d}:{total_seconds % 60:02d}"
+
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(timedelta, _format_time)
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter("TIME", lambda value: _parse_time(value.decode()))
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+
+# MySQL functions the queries in models.py use
+def _register_functions(conn):
+    def date_function(name, args, func):
+        conn.create_function(name, args, func, deterministic=True)
+
+    conn.create_function("CURDATE", 0, lambda: date.today().isoformat())
+    date_function("YEAR", 1, lambda value: None if value is None else _to_date(value).year)
+    date_function("MONTH", 1, lambda value: None if value is None else _to_date(value).month)
+    date_function("DAYOFMONTH", 1, lambda value: None if value is None else _to_date(value).day)
+    date_function("WEEKDAY", 1, lambda value: None if value is None else _to_date(value).weekday())
+    date_function("SUBDATE", 2, lambda value, days: None if value is None else
+                  (_to_date(value) - timedelta(days=int(days))).isoformat())
+    date_function("MAKEDATE", 2, lambda year, day: (date(int(year), 1, 1) + timedelta(days=int(day) - 1)).isoformat())
+    date_function("CONCAT", -1, lambda *values: None if None in values else "".join(str(value) for value in values))
+
+
+_PLACEHOLDER = re.compile(r"%s|%%")
+_LOCKING = re.compile(r"\s+FOR\s+(?:UPDATE|SHARE)(?:\s+SKIP\s+LOCKED|\s+NOWAIT)?", re.IGNORECASE)
+_UPSERT = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", re.IGNORECASE)
+_UPSERT_VALUES = re.compile(r"VALUES\((\w+)\)", re.IGNORECASE)
+_WRITE = re.compile(r"^\s*(?:INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """(SQLite SQL, starts a write transaction, skip) for a MySQL statement."""
+    if re.match(r"\s*SET\s+(?:SESSION\s+)?TRANSACTION\b", sql, re.IGNORECASE):
+        # Isolation levels: SQLite transactions are always serializable
+        return sql, False, True
+    locking = bool(_LOCKING.search(sql))
+    sql = _LOCKING.sub("", sql)
+    upsert = _UPSERT.search(sql)
+    if upsert:
+        head, tail = sql[:upsert.start()], sql[upsert.end():]
+        sql = head + "ON CONFLICT DO UPDATE SET" + _UPSERT_VALUES.sub(r"excluded.\1", tail)
+    sql = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", sql, flags=re.IGNORECASE)
+    sql = _PLACEHOLDER.sub(lambda match: "?" if match.group() == "%s" else "%", sql)
+    return sql, locking or bool(_WRITE.match(sql)), False
+
+
+class SQLiteCursor:
+    """The parts of the mysql.connector cursor API that models.py uses."""
+
+    def __init__(self, conn, dictionary=False):
+        self._conn = conn
+        self._cursor = conn.cursor()
+        self._dictionary = dictionary
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def _begin(self, writes):
+        if writes and not self._conn.in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE")
+
+    def execute(self, operation, params=None):
+        sql, writes, skip = translate(operation)
+        if skip:
+            return
+        self._begin(writes)
+        self._cursor.execute(sql, params or ())
+
+    def executemany(self, operation, seq_params):
+        sql, writes, skip = translate(operation)
+        if skip:
+            return
+        self._begin(writes)
+        self._cursor.executemany(sql, seq_params)
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        rows = self._cursor.fetchmany(size)
+        return [self._row(row) for row in rows] if self._dictionary else rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        return [self._row(row) for row in rows] if self._dictionary else rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """A thread's connection. close() ends any open transaction but keeps it open."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False, buffered=None, prepared=False, **kwargs):
+        # sqlite3 already keeps each connection's compiled statements in
+        # its own cache, so prepared=True needs nothing extra here
+        return SQLiteCursor(self._conn, dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def consume_results(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def close(self):
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+
+def _connect(path=SQLITE_PATH):
+    conn = sqlite3.connect(path, isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    _register_functions(conn)
+    return SQLiteConnection(conn)
+
+
+_local = threading.local()
+
+
+def get_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
+    return conn
+
+
+def init_db():
+    """Create the schema on first use, then apply any newer SQLite migrations."""
+    conn = _connect()._conn
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Schema_Migrations'"
+        ).fetchone()
+        if not exists:
+            with open(SCHEMA_PATH, encoding="utf-8") as f:
+                schema = f.read()
+            conn.executescript(
+                "BEGIN;\n" + schema + """
+                CREATE TABLE Schema_Migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+                COMMIT;
+                """
+            )
+            conn.executemany(
+                "INSERT INTO Schema_Migrations (version, description) VALUES (?, ?)",
+                [(version, description) for version, description, _ in MIGRATIONS
+                 if version <= SQLITE_SCHEMA_VERSION]
+            )
+        current = conn.execute("SELECT COALESCE(MAX(version), 0) FROM Schema_Migrations").fetchone()[0]
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in SQLITE_MIGRATIONS.get(version, statements):
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO Schema_Migrations (version, description) VALUES (?, ?)", (version, description)
+            )
+            conn.commit()
+            print(f"Applied migration {version}: {description}")
+    finally:
+        conn.close()
+    print(f"SQLite database ready at {SQLITE_PATH}")
@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+# The engine is chosen when database.py is imported, so configure it first
+os.environ["DB_ENGINE"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "test.sqlite")
+os.environ["ARCHIVE_INTERVAL"] = "0"
+os.environ["LEDGER_COMPACT_INTERVAL"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app  # noqa: E402
+from database import get_db_connection  # noqa: E402
+import models  # noqa: E402
+
+
+def count(table):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def test_delete_customer_with_archived_history():
+    client = app.test_client()
+    assert client.post("/customers", json={
+        "name": "Old Customer", "email": "old@example.com", "phone": "1", "address": "x"
+    }).status_code == 201
+    customer_id = client.get("/customers").get_json()[0]["customer_id"]
+    client.post(f"/customers/{customer_id}/vehicles", json={"model_year": "2015", "license_plate": "OLD1"})
+    vehicle_id = client.get(f"/customers/{customer_id}/vehicles").get_json()[0]["vehicle_id"]
+    client.post("/service_packages", json={
+        "package_name": "Wash", "package_description": "d", "price": "10", "duration": 60
+    })
+    client.post("/employees", json={"name": "Ravi", "email": "ravi@example.com", "phone": "2"})
+    models.add_inventory("Wax", 10, 1)
+
+    past = (date.today() - timedelta(days=200)).isoformat()
+    with app.app_context():
+        appointment_id = models.add_schedule_appointment(
+            customer_id, vehicle_id, 1, 1, past, "09:00", "x", 60, [{"inventory_id": 1, "quantity": 2}]
+        )
+        models.update_appointment_status(appointment_id, "completed")
+        assert models.archive_appointments(90) == 1
+        assert count("Appointments_Archive") == 1
+        assert count("ServiceRecord_Inventory_Archive") == 1
+
+    assert client.delete(f"/customers/{customer_id}").status_code == 201
+    for table in ("Appointments_Archive", "Service_Records_Archive", "ServiceRecord_Inventory_Archive",
+                  "Feedback_Archive", "Customers"):
+        assert count(table) == 0
+    assert client.get("/metrics").get_json()["appointment_count"] == 0
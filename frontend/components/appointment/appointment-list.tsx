@@ -51,6 +51,8 @@ type Appointment = {
   status: "scheduled" | "completed" | "canceled";
 };
 
+const PAGE_SIZE = 100;
+
 const formSchema = z.object({
   appointment_date: z.string().nonempty({ message: "Date is required" }),
   appointment_time: z.string().nonempty({ message: "Time is required" }),
@@ -66,6 +68,7 @@ export default function AppointmentList() {
   const [sortColumn, setSortColumn] = useState<keyof Appointment | null>(null);
   const [sortDirection, setSortDirection] = useState<"asc" | "desc">("asc");
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [editingAppointment, setEditingAppointment] =
     useState<Appointment | null>(null);
 
@@ -81,9 +84,12 @@ export default function AppointmentList() {
   useEffect(() => {
     async function fetchAppointments() {
       try {
-        const response = await axios.get("http://localhost:5000/appointments");
+        const response = await axios.get("http://localhost:5000/appointments", {
+          params: { limit: PAGE_SIZE },
+        });
         setAppointments(response.data);
         setFilteredAppointments(response.data);
+        setNextCursor(response.headers["x-next-cursor"] ?? null);
       } catch (error) {
         console.error(error);
       } finally {
@@ -93,6 +99,22 @@ export default function AppointmentList() {
     fetchAppointments();
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      const response = await axios.get("http://localhost:5000/appointments", {
+        params: { limit: PAGE_SIZE, after: nextCursor },
+      });
+      const updatedAppointments = [...appointments, ...response.data];
+      setAppointments(updatedAppointments);
+      setFilteredAppointments(updatedAppointments);
+      setFilterValue("");
+      setNextCursor(response.headers["x-next-cursor"] ?? null);
+    } catch (error) {
+      console.error(error);
+    }
+  };
+
   const handleFilter = (value: string) => {
     setFilterValue(value);
     const filtered = appointments.filter((appointment) =>
@@ -334,6 +356,17 @@ export default function AppointmentList() {
             ))}
           </TableBody>
         </Table>
+        {nextCursor && (
+          <div className="flex justify-center mt-4">
+            <Button
+              variant="outline"
+              className="border-purple-600 text-purple-600 hover:bg-purple-100"
+              onClick={loadMore}
+            >
+              Load more
+            </Button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -75,6 +75,11 @@ type Vehicle = {
   customer_name: string;
 };
 
+type Slot = {
+  time: string;
+  employees: number[];
+};
+
 type Customer = {
   customer_id: number;
   name: string;
@@ -97,7 +102,9 @@ export default function ImprovedAppointmentForm() {
     setLoading(true);
     async function fetchUsers() {
       await axios
-        .get("http://localhost:5000/customers")
+        .get("http://localhost:5000/customers", {
+          params: { fields: "customer_id,name" },
+        })
         .then((response) => {
           console.log(response.data);
           setCustomers(response.data as Customer[]);
@@ -109,7 +116,9 @@ export default function ImprovedAppointmentForm() {
     }
     async function fetchVehicles() {
       await axios
-        .get("http://localhost:5000/vehicles")
+        .get("http://localhost:5000/vehicles", {
+          params: { fields: "vehicle_id,license_plate" },
+        })
         .then((response) => {
           console.log(response.data);
           setVehicles(response.data as Vehicle[]);
@@ -133,7 +142,9 @@ export default function ImprovedAppointmentForm() {
     }
     async function fetchEmployees() {
       await axios
-        .get("http://localhost:5000/employees")
+        .get("http://localhost:5000/employees", {
+          params: { fields: "employee_id,name,email" },
+        })
         .then((response) => {
           console.log(response.data);
           setEmployees(response.data as Employee[]);
@@ -145,7 +156,9 @@ export default function ImprovedAppointmentForm() {
     }
     async function fetchInventoryItems() {
       await axios
-        .get("http://localhost:5000/inventory")
+        .get("http://localhost:5000/inventory", {
+          params: { fields: "inventory_id,product_name" },
+        })
         .then((response) => {
           console.log(response.data);
           setInventoryItems(response.data as Inventory[]);
@@ -176,6 +189,34 @@ export default function ImprovedAppointmentForm() {
     },
   });
 
+  const [slots, setSlots] = useState<Slot[]>([]);
+  const packageId = form.watch("package_id");
+  const appointmentDate = form.watch("appointment_date");
+  const employeeId = form.watch("employee_id");
+
+  // Offer only the start times the backend's availability index says are free
+  useEffect(() => {
+    if (!packageId || !appointmentDate) {
+      setSlots([]);
+      return;
+    }
+    axios
+      .get("http://localhost:5000/availability", {
+        params: {
+          package_id: packageId,
+          date: format(appointmentDate, "yyyy-MM-dd"),
+          employee_id: employeeId || undefined,
+        },
+      })
+      .then((response) => {
+        setSlots(response.data.slots as Slot[]);
+      })
+      .catch((error) => {
+        console.error(error);
+        setSlots([]);
+      });
+  }, [packageId, appointmentDate, employeeId]);
+
   const { fields, append, remove } = useFieldArray({
     control: form.control,
     name: "inventory_items",
@@ -323,7 +364,7 @@ export default function ImprovedAppointmentForm() {
                             <div className="flex justify-between items-center">
                               <span>{pkg.package_name}</span>
                               <span className="text-muted-foreground ml-4">
-                                ${pkg.price} - {pkg.duration} week(s)
+                                ${pkg.price} - {pkg.duration} min
                               </span>
                             </div>
                           </SelectItem>
@@ -393,20 +434,27 @@ export default function ImprovedAppointmentForm() {
                       <FormLabel>Time</FormLabel>
                       <Select
                         onValueChange={field.onChange}
-                        defaultValue={field.value}
+                        value={field.value}
                       >
                         <FormControl>
                           <SelectTrigger>
-                            <SelectValue placeholder="Select a time" />
+                            <SelectValue
+                              placeholder={
+                                packageId
+                                  ? slots.length
+                                    ? "Select a time"
+                                    : "No free times on this day"
+                                  : "Select a package first"
+                              }
+                            />
                           </SelectTrigger>
                         </FormControl>
                         <SelectContent>
-                          <SelectItem value="09:00">9:00 AM</SelectItem>
-                          <SelectItem value="10:00">10:00 AM</SelectItem>
-                          <SelectItem value="11:00">11:00 AM</SelectItem>
-                          <SelectItem value="13:00">1:00 PM</SelectItem>
-                          <SelectItem value="14:00">2:00 PM</SelectItem>
-                          <SelectItem value="15:00">3:00 PM</SelectItem>
+                          {slots.map((slot) => (
+                            <SelectItem key={slot.time} value={slot.time}>
+                              {slot.time}
+                            </SelectItem>
+                          ))}
                         </SelectContent>
                       </Select>
                       <FormMessage />
@@ -474,7 +522,7 @@ export default function ImprovedAppointmentForm() {
                 name="service_duration"
                 render={({ field }) => (
                   <FormItem>
-                    <FormLabel>Service Duration (weeks)</FormLabel>
+                    <FormLabel>Service Duration (minutes)</FormLabel>
                     <FormControl>
                       <Input
                         type="number"
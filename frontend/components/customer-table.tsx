@@ -1,6 +1,6 @@
 "use client";
 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   Table,
   TableBody,
@@ -48,6 +48,8 @@ type Customer = {
   address: string;
 };
 
+const PAGE_SIZE = 100;
+
 const formSchema = z.object({
   name: z.string().min(2, { message: "Name must be at least 2 characters." }),
   email: z.string().email({ message: "Invalid email address." }),
@@ -69,6 +71,7 @@ export default function CustomerTable() {
   const [sortDirection, setSortDirection] = useState<"asc" | "desc">("asc");
   const [isAddCustomerOpen, setIsAddCustomerOpen] = useState(false);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   const form = useForm<z.infer<typeof formSchema>>({
     resolver: zodResolver(formSchema),
@@ -94,11 +97,13 @@ export default function CustomerTable() {
     setLoading(true);
     async function fetchCustomers() {
       try {
-        const response = await axios.get("http://localhost:5000/customers");
+        const response = await axios.get("http://localhost:5000/customers", {
+          params: { limit: PAGE_SIZE },
+        });
         const fetchedCustomers = response.data;
-        console.log(fetchedCustomers);
         setCustomers(fetchedCustomers);
         setFilteredCustomers(fetchedCustomers);
+        setNextCursor(response.headers["x-next-cursor"] ?? null);
       } catch (error) {
         console.error(error);
         setCustomers([]);
@@ -110,18 +115,60 @@ export default function CustomerTable() {
     fetchCustomers();
   }, []);
 
-  const handleFilter = (value: string) => {
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      const response = await axios.get("http://localhost:5000/customers", {
+        params: { limit: PAGE_SIZE, after: nextCursor },
+      });
+      const updatedCustomers = [...customers, ...response.data];
+      setCustomers(updatedCustomers);
+      setFilteredCustomers(updatedCustomers);
+      setFilterValue("");
+      setNextCursor(response.headers["x-next-cursor"] ?? null);
+    } catch (error) {
+      console.error(error);
+    }
+  };
+
+  const latestQuery = useRef("");
+
+  // Short queries filter the loaded page; longer ones ask the server's
+  // search index, which covers every customer and matches license plates too
+  const handleFilter = async (value: string) => {
     setFilterValue(value);
-    if (customers.length === 0) {
-      setFilteredCustomers([]);
+    latestQuery.current = value;
+    if (value.trim().length < 2) {
+      setFilteredCustomers(
+        customers.filter((customer) =>
+          Object.values(customer).some((field) =>
+            field.toString().toLowerCase().includes(value.toLowerCase())
+          )
+        )
+      );
       return;
     }
-    const filtered = customers.filter((customer) =>
-      Object.values(customer).some((field) =>
-        field.toString().toLowerCase().includes(value.toLowerCase())
-      )
-    );
-    setFilteredCustomers(filtered);
+    try {
+      const response = await axios.get("http://localhost:5000/search", {
+        params: { q: value, limit: 50 },
+      });
+      if (latestQuery.current !== value) return;
+      const matches = new Map<number, Customer>();
+      for (const result of response.data) {
+        if (!matches.has(result.customer_id)) {
+          matches.set(result.customer_id, {
+            customer_id: result.customer_id,
+            name: result.name,
+            email: result.email,
+            phone: result.phone,
+            address: result.address,
+          });
+        }
+      }
+      setFilteredCustomers(Array.from(matches.values()));
+    } catch (error) {
+      console.error(error);
+    }
   };
 
   const handleSort = (column: keyof Customer) => {
@@ -519,6 +566,17 @@ export default function CustomerTable() {
                 ))}
               </TableBody>
             </Table>
+            {nextCursor && (
+              <div className="flex justify-center mt-4">
+                <Button
+                  variant="outline"
+                  className="border-purple-600 text-purple-600 hover:bg-purple-100"
+                  onClick={loadMore}
+                >
+                  Load more
+                </Button>
+              </div>
+            )}
           </div>
         )}
       </div>
@@ -1,9 +1,7 @@
 "use client";
 
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
-import axios from "axios";
 import { AlertCircle } from "lucide-react";
-import { useEffect, useState } from "react";
 
 const insights = [
   "You have 5 appointments scheduled for today.",
@@ -11,28 +9,19 @@ const insights = [
   "2 employees are inactive. Consider assigning them to tasks.",
 ];
 
-export default function ActionableInsights() {
-  const [insights, setInsights] = useState([]);
-  const [loading, setLoading] = useState(true);
-  useEffect(() => {
-    setLoading(true);
-    async function fetchData() {
-      try {
-        const res = await axios.get(
-          "http://localhost:5000/actionable-insights"
-        );
-        setInsights(res.data);
-        setLoading(false);
-      } catch (err) {
-        console.error(err);
-      } finally {
-        setLoading(false);
-      }
-    }
-    fetchData();
-  }, []);
+export type Insights = {
+  appointments_today: number;
+  low_inventory: number;
+};
 
-  if (loading) {
+export default function ActionableInsights({
+  insights,
+  loading,
+}: {
+  insights: Insights | null;
+  loading: boolean;
+}) {
+  if (loading || !insights) {
     return (
       <Card className="w-full lg:w-96 bg-white border-purple-200 shadow-md">
         <CardHeader>
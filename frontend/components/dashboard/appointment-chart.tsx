@@ -1,8 +1,6 @@
 "use client";
 
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
-import axios from "axios";
-import { useEffect, useState } from "react";
 import {
   Line,
   LineChart,
@@ -12,26 +10,13 @@ import {
   YAxis,
 } from "recharts";
 
-export default function AppointmentChart() {
-  const [data, setData] = useState([]);
-  const [loading, setLoading] = useState(true);
-  useEffect(() => {
-    setLoading(true);
-    async function fetchAppointments() {
-      try {
-        const res = await axios.get(
-          "http://localhost:5000/monthy_appointments"
-        );
-        setData(res.data);
-        setLoading(false);
-      } catch (err) {
-        console.error(err);
-      } finally {
-        setLoading(false);
-      }
-    }
-    fetchAppointments();
-  }, []);
+export default function AppointmentChart({
+  data,
+  loading,
+}: {
+  data: { name: string; appointments: number }[];
+  loading: boolean;
+}) {
 
   if (loading) {
     return (
@@ -12,30 +12,21 @@ import {
 import { Button } from "@/components/ui/button";
 import { ExternalLink } from "lucide-react";
 import Link from "next/link";
-import { useEffect, useState } from "react";
-import axios from "axios";
 
-export default function AppointmentOverview() {
-  const [data, setData] = useState([]);
-  const [loading, setLoading] = useState(true);
-  useEffect(() => {
-    setLoading(true);
-    async function fetchData() {
-      try {
-        const res = await axios.get(
-          "http://localhost:5000/upcoming-appointments"
-        );
-        console.log(res.data);
-        setData(res.data);
-        setLoading(false);
-      } catch (err) {
-        console.error(err);
-      } finally {
-        setLoading(false);
-      }
-    }
-    fetchData();
-  }, []);
+export type UpcomingAppointment = {
+  date_time: string;
+  time?: string;
+  customer: string;
+  vehicle: string;
+  service: string;
+  status: string;
+};
+
+export default function AppointmentOverview({
+  data,
+}: {
+  data: UpcomingAppointment[];
+}) {
   return (
     <Card className="flex-1 bg-white border-purple-200 shadow-md">
       <CardHeader>
@@ -0,0 +1,137 @@
+"use client";
+
+import axios from "axios";
+import { useEffect, useState } from "react";
+import MetricCards, { MetricCounts } from "@/components/dashboard/metric-cards";
+import ActionableInsights, {
+  Insights,
+} from "@/components/dashboard/actionable-insights";
+import AppointmentChart from "@/components/dashboard/appointment-chart";
+import ServicePopularityChart from "@/components/dashboard/service-popularity-chart";
+import AppointmentOverview, {
+  UpcomingAppointment,
+} from "@/components/dashboard/appointment-overview";
+import InventoryUsageChart from "@/components/dashboard/inventory-usage-chart";
+
+type ChartPoint = { name: string; value: number };
+
+type DashboardData = {
+  metrics: MetricCounts;
+  actionable_insights: Insights;
+  service_usage: ChartPoint[];
+  inventory_usage: ChartPoint[];
+  monthly_appointments: { name: string; appointments: number }[];
+  upcoming_appointments: UpcomingAppointment[];
+};
+
+// Which panels to refetch when a table changes, and the endpoint that
+// serves each panel on its own
+const PANELS: {
+  key: keyof DashboardData;
+  url: string;
+  tables: string[];
+}[] = [
+  {
+    key: "metrics",
+    url: "/metrics",
+    tables: ["Customers", "Vehicles", "Appointments", "Inventory"],
+  },
+  {
+    key: "actionable_insights",
+    url: "/actionable-insights",
+    tables: ["Appointments", "Inventory"],
+  },
+  {
+    key: "service_usage",
+    url: "/service-usage",
+    tables: ["Service_Packages", "Appointments"],
+  },
+  {
+    key: "inventory_usage",
+    url: "/inventory-usage",
+    tables: ["Inventory", "ServiceRecord_Inventory"],
+  },
+  {
+    key: "monthly_appointments",
+    url: "/monthy_appointments",
+    tables: ["Appointments"],
+  },
+  {
+    key: "upcoming_appointments",
+    url: "/upcoming-appointments",
+    tables: ["Appointments", "Vehicles", "Customers", "Service_Packages"],
+  },
+];
+
+export default function DashboardPanels() {
+  const [data, setData] = useState<DashboardData | null>(null);
+  const [loading, setLoading] = useState(true);
+  useEffect(() => {
+    setLoading(true);
+    async function fetchData() {
+      try {
+        const res = await axios.get("http://localhost:5000/dashboard");
+        setData(res.data);
+      } catch (err) {
+        console.error(err);
+      } finally {
+        setLoading(false);
+      }
+    }
+    fetchData();
+
+    // Refresh only the panels whose tables changed instead of polling
+    const events = new EventSource("http://localhost:5000/events?types=tables.changed");
+    events.addEventListener("tables.changed", async (event) => {
+      const { tables } = JSON.parse((event as MessageEvent).data);
+      const stale = PANELS.filter((panel) =>
+        panel.tables.some((table) => tables.includes(table)),
+      );
+      try {
+        const updates = await Promise.all(
+          stale.map(async (panel) => {
+            const res = await axios.get(`http://localhost:5000${panel.url}`);
+            return [panel.key, res.data] as const;
+          }),
+        );
+        setData((current) =>
+          current ? { ...current, ...Object.fromEntries(updates) } : current,
+        );
+      } catch (err) {
+        console.error(err);
+      }
+    });
+    // Missed more than the server kept: reload everything
+    events.addEventListener("reset", fetchData);
+    return () => events.close();
+  }, []);
+
+  return (
+    <>
+      <div className="grid gap-6 md:grid-cols-2 lg:grid-cols-4">
+        <MetricCards data={data?.metrics ?? null} loading={loading} />
+      </div>
+      <div className="grid gap-6 md:grid-cols-2 lg:grid-cols-3">
+        <AppointmentChart
+          data={data?.monthly_appointments ?? []}
+          loading={loading}
+        />
+        <ServicePopularityChart
+          data={data?.service_usage ?? []}
+          loading={loading}
+        />
+        <InventoryUsageChart
+          data={data?.inventory_usage ?? []}
+          loading={loading}
+        />
+      </div>
+      <div className="flex gap-x-6">
+        <AppointmentOverview data={data?.upcoming_appointments ?? []} />
+        <ActionableInsights
+          insights={data?.actionable_insights ?? null}
+          loading={loading}
+        />
+      </div>
+    </>
+  );
+}
@@ -1,8 +1,6 @@
 "use client";
 
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
-import axios from "axios";
-import { useEffect, useState } from "react";
 import { Cell, Pie, PieChart, ResponsiveContainer, Tooltip } from "recharts";
 
 const data = [
@@ -14,25 +12,13 @@ const data = [
 
 const COLORS = ["#6366F1", "#8B5CF6", "#A78BFA", "#C4B5FD"];
 
-export default function InventoryUsageChart() {
-  const [data, setData] = useState([]);
-  const [loading, setLoading] = useState(true);
-  useEffect(() => {
-    setLoading(true);
-    async function fetchData() {
-      try {
-        const res = await axios.get("http://localhost:5000/inventory-usage");
-        setData(res.data);
-        setLoading(false);
-      } catch (err) {
-        console.error(err);
-      } finally {
-        setLoading(false);
-      }
-    }
-    fetchData();
-  }, []);
-
+export default function InventoryUsageChart({
+  data,
+  loading,
+}: {
+  data: { name: string; value: number }[];
+  loading: boolean;
+}) {
   if (loading) {
     return (
       <Card className="bg-white border-purple-200 shadow-md">
@@ -1,9 +1,7 @@
 "use client";
 
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
-import axios from "axios";
 import { Users, Car, Calendar, Package } from "lucide-react";
-import { useEffect, useState } from "react";
 
 // const metrics = [
 //   {
@@ -39,42 +37,45 @@ type Metric = {
   // description?: string;
 };
 
-export default function MetricCards() {
-  const [loading, setLoading] = useState(true);
-  const [metrics, setMetrics] = useState<Metric[]>([]);
-  useEffect(() => {
-    setLoading(true);
-    axios.get("http://localhost:5000/metrics").then((response) => {
-      setLoading(false);
-      console.log(response.data);
-      setMetrics([
-        {
-          title: "Total Inventory",
-          value: response.data.inventory_count,
-          icon: Package,
-        },
-        {
-          title: "Total Customers",
-          value: response.data.customer_count,
-          icon: Users,
-        },
-        {
-          title: "Total Vehicles",
-          value: response.data.vehicle_count,
-          icon: Car,
-        },
-        {
-          title: "Appointments",
-          value: response.data.appointment_count,
-          icon: Calendar,
-        },
-      ]);
-    });
-  }, []);
+export type MetricCounts = {
+  customer_count: number;
+  vehicle_count: number;
+  appointment_count: number;
+  inventory_count: number;
+};
 
-  if (loading) {
+export default function MetricCards({
+  data,
+  loading,
+}: {
+  data: MetricCounts | null;
+  loading: boolean;
+}) {
+  if (loading || !data) {
     return <div>Loading...</div>;
   }
+  const metrics: Metric[] = [
+    {
+      title: "Total Inventory",
+      value: String(data.inventory_count),
+      icon: Package,
+    },
+    {
+      title: "Total Customers",
+      value: String(data.customer_count),
+      icon: Users,
+    },
+    {
+      title: "Total Vehicles",
+      value: String(data.vehicle_count),
+      icon: Car,
+    },
+    {
+      title: "Appointments",
+      value: String(data.appointment_count),
+      icon: Calendar,
+    },
+  ];
   return (
     <>
       {metrics.map((metric) => (
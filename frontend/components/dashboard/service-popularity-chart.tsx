@@ -1,8 +1,6 @@
 "use client";
 
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
-import axios from "axios";
-import { useEffect, useState } from "react";
 import {
   Bar,
   BarChart,
@@ -20,24 +18,13 @@ const data = [
   { name: "Ceramic Coating", value: 100 },
 ];
 
-export default function ServicePopularityChart() {
-  const [data, setData] = useState([]);
-  const [loading, setLoading] = useState(true);
-  useEffect(() => {
-    setLoading(true);
-    async function fetchData() {
-      try {
-        const res = await axios.get("http://localhost:5000/service-usage");
-        setData(res.data);
-        setLoading(false);
-      } catch (err) {
-        console.error(err);
-      } finally {
-        setLoading(false);
-      }
-    }
-    fetchData();
-  }, []);
+export default function ServicePopularityChart({
+  data,
+  loading,
+}: {
+  data: { name: string; value: number }[];
+  loading: boolean;
+}) {
 
   if (loading) {
     return (
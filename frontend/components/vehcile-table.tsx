@@ -69,6 +69,8 @@ type Customer = {
   address: string;
 };
 
+const PAGE_SIZE = 100;
+
 const formSchema = z.object({
   make_year: z.string().nonempty(),
   license_plate: z.string().nonempty(),
@@ -84,6 +86,7 @@ export default function VehicleTable() {
   const [sortDirection, setSortDirection] = useState<"asc" | "desc">("asc");
   const [isAddVehicleOpen, setIsAddVehicleOpen] = useState(false);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   const form = useForm<z.infer<typeof formSchema>>({
     resolver: zodResolver(formSchema),
@@ -98,11 +101,14 @@ export default function VehicleTable() {
     async function fetchData() {
       try {
         const [vehiclesRes, customersRes] = await Promise.all([
-          axios.get("http://localhost:5000/vehicles"),
+          axios.get("http://localhost:5000/vehicles", {
+            params: { limit: PAGE_SIZE },
+          }),
           axios.get("http://localhost:5000/customers"),
         ]);
         setVehicles(vehiclesRes.data);
         setFilteredVehicles(vehiclesRes.data);
+        setNextCursor(vehiclesRes.headers["x-next-cursor"] ?? null);
         setCustomers(customersRes.data);
       } catch (error) {
         console.error(error);
@@ -113,6 +119,22 @@ export default function VehicleTable() {
     fetchData();
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      const response = await axios.get("http://localhost:5000/vehicles", {
+        params: { limit: PAGE_SIZE, after: nextCursor },
+      });
+      const updatedVehicles = [...vehicles, ...response.data];
+      setVehicles(updatedVehicles);
+      setFilteredVehicles(updatedVehicles);
+      setFilterValue("");
+      setNextCursor(response.headers["x-next-cursor"] ?? null);
+    } catch (error) {
+      console.error(error);
+    }
+  };
+
   const handleFilter = (value: string) => {
     setFilterValue(value);
     const filtered = vehicles.filter((vehicle) =>
@@ -360,6 +382,17 @@ export default function VehicleTable() {
               ))}
             </TableBody>
           </Table>
+          {nextCursor && (
+            <div className="flex justify-center mt-4">
+              <Button
+                variant="outline"
+                className="border-purple-600 text-purple-600 hover:bg-purple-100"
+                onClick={loadMore}
+              >
+                Load more
+              </Button>
+            </div>
+          )}
         </div>
       </div>
     </div>